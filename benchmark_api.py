@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Mesure de performance de l'API de provisionnement contre un Odoo factice
+
+Lance fake_odoo_server.py (latence, gigue et pannes réglables) puis, pour
+chaque transport RPC (xmlrpc avec pool de threads, jsonrpc asynchrone), une
+instance de odoo_api.py, et envoie un mélange configurable de requêtes
+concurrentes (créations, lectures, changements de rôles, listings).
+Le débit et les percentiles de latence p50/p95/p99, globaux et par
+opération, sont affichés et peuvent être enregistrés en JSON pour comparer
+les exécutions.
+
+Usage:
+    python3 benchmark_api.py --requests 2000 --concurrency 200 --latency 0.05
+    python3 benchmark_api.py --mix create=1,read=8,roles=1 --error-rate 0.01 --output run.json
+
+Auteur: Système IAM Odoo
+Date: 2025-05-28
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+import uuid
+from datetime import datetime
+from typing import Dict, List
+
+import aiohttp
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+OPERATIONS = ("create", "read", "roles", "list")
+DEFAULT_MIX = "create=1,read=8,roles=1"
+ROLE_GROUPS = [3, 4, 5]  # Groupes du serveur factice attribués par l'opération "roles"
+
+
+def start_process(args, env=None) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable] + args, cwd=HERE, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_until_ready(url: str, timeout: float = 20.0):
+    """Attend que l'API réponde et soit connectée à Odoo"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"{url}/health", timeout=1.0) as response:
+                if json.load(response).get("odoo_connection"):
+                    return
+        except (OSError, ValueError):
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"L'API {url} n'a pas démarré dans les {timeout}s")
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """Convertit "create=1,read=8,roles=1" en poids par opération"""
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"Opération inconnue: {name} (valeurs: {', '.join(OPERATIONS)})")
+        try:
+            weights[name] = float(weight or 1)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"Poids invalide pour {name}: {weight}")
+    if not any(weights.values()):
+        raise argparse.ArgumentTypeError("Le mélange ne contient aucune opération")
+    return weights
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Percentile par rang le plus proche d'une liste triée"""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(fraction * len(sorted_values))
+    return sorted_values[min(len(sorted_values), max(rank, 1)) - 1]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> dict:
+    values = sorted(latencies)
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "rps": round(len(values) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(1000 * sum(values) / len(values), 2) if values else 0.0,
+        "p50_ms": round(1000 * percentile(values, 0.50), 2),
+        "p95_ms": round(1000 * percentile(values, 0.95), 2),
+        "p99_ms": round(1000 * percentile(values, 0.99), 2),
+        "max_ms": round(1000 * values[-1], 2) if values else 0.0,
+    }
+
+
+async def seed_users(session: aiohttp.ClientSession, url: str, count: int, run_id: str) -> List[int]:
+    """Crée les utilisateurs servant aux lectures et changements de rôles"""
+    batch = [{"user_account": {"login_name": f"bench-{run_id}-seed-{index}@example.com", "other_ids": {}},
+              "groups": [1]} for index in range(count)]
+    async with session.post(f"{url}/users/batch", json=batch) as response:
+        body = await response.json()
+    if response.status >= 400:
+        raise RuntimeError(f"Création des utilisateurs de test impossible ({response.status}): {body}")
+    user_ids = [result["user_id"] for result in body["results"] if result["success"]]
+    if not user_ids:
+        raise RuntimeError(f"Aucun des {count} utilisateurs de test n'a été créé: "
+                           f"{body['results'][:1] or 'lot vide (--seed-users 0)'}")
+    return user_ids
+
+
+async def run_load(url: str, total: int, concurrency: int, mix: Dict[str, float],
+                   seed: int = 100) -> dict:
+    """Envoie `total` requêtes tirées selon `mix` avec `concurrency` requêtes en vol"""
+    operations = [name for name in mix if mix[name] > 0]
+    plan = random.choices(operations, weights=[mix[name] for name in operations], k=total)
+    latencies: Dict[str, List[float]] = {name: [] for name in operations}
+    errors = dict.fromkeys(operations, 0)
+    statuses: Dict[str, int] = {}
+    remaining = iter(plan)
+    run_id = uuid.uuid4().hex[:12]
+    created = 0
+
+    async with aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=concurrency),
+            timeout=aiohttp.ClientTimeout(total=60.0)) as session:
+        user_ids = await seed_users(session, url, seed, run_id)
+
+        def request(operation: str):
+            nonlocal created
+            if operation == "create":
+                created += 1
+                return session.post(f"{url}/users/", json={
+                    "user_account": {"login_name": f"bench-{run_id}-{created}@example.com",
+                                     "other_ids": {}},
+                    "groups": [1]
+                })
+            if operation == "read":
+                return session.get(f"{url}/users/{random.choice(user_ids)}")
+            if operation == "roles":
+                group = random.choice(ROLE_GROUPS)
+                method = session.post if random.random() < 0.5 else session.delete
+                return method(f"{url}/users/{random.choice(user_ids)}/roles", json={"groups": [group]})
+            return session.get(f"{url}/users/", params={"limit": 100,
+                                                        "after": random.choice(user_ids) - 1})
+
+        async def worker():
+            for operation in remaining:
+                start = time.perf_counter()
+                try:
+                    async with request(operation) as response:
+                        await response.read()
+                        status = str(response.status)
+                        if response.status >= 400:
+                            errors[operation] += 1
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    status = type(e).__name__
+                    errors[operation] += 1
+                latencies[operation].append(time.perf_counter() - start)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+        async with session.get(f"{url}/health") as response:
+            health = await response.json()
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    result = summarize(all_latencies, sum(errors.values()), elapsed)
+    result["elapsed"] = round(elapsed, 3)
+    result["statuses"] = dict(sorted(statuses.items()))
+    result["operations"] = {name: summarize(latencies[name], errors[name], elapsed)
+                            for name in operations}
+    result["rpc_client"] = health.get("rpc_client")
+    return result
+
+
+def benchmark_transport(transport: str, odoo_url: str, port: int, args) -> dict:
+    # Stockages SQLite propres à chaque exécution (caches, tâches, idempotence)
+    with tempfile.TemporaryDirectory(prefix="odoo-bench-") as state_dir:
+        env = dict(os.environ, ODOO_URL=odoo_url, ODOO_TRANSPORT=transport,
+                   ODOO_API_CACHE_DB=os.path.join(state_dir, "cache.sqlite3"),
+                   ODOO_API_JOBS_DB=os.path.join(state_dir, "jobs.sqlite3"),
+                   ODOO_API_IDEMPOTENCY_DB=os.path.join(state_dir, "idempotency.sqlite3"))
+        api = start_process(["-m", "uvicorn", "odoo_api:app", "--port", str(port),
+                             "--log-level", "warning"], env=env)
+        url = f"http://127.0.0.1:{port}"
+        try:
+            wait_until_ready(url)
+            return asyncio.run(run_load(url, args.requests, args.concurrency, args.mix, args.seed_users))
+        finally:
+            api.terminate()
+            api.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de l'API de provisionnement Odoo")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"Poids des opérations {'/'.join(OPERATIONS)} (défaut: {DEFAULT_MIX})")
+    parser.add_argument("--seed-users", type=int, default=100,
+                        help="Utilisateurs créés avant la mesure pour les lectures et les rôles")
+    parser.add_argument("--latency", type=float, default=0.05,
+                        help="Latence simulée d'Odoo par appel, en secondes")
+    parser.add_argument("--jitter", type=float, default=0.0,
+                        help="Délai aléatoire supplémentaire maximum par appel Odoo, en secondes")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Proportion des appels Odoo en erreur serveur (0 à 1)")
+    parser.add_argument("--drop-rate", type=float, default=0.0,
+                        help="Proportion des appels Odoo dont la connexion est coupée (0 à 1)")
+    parser.add_argument("--odoo-port", type=int, default=18069)
+    parser.add_argument("--api-port", type=int, default=18000)
+    parser.add_argument("--transports", nargs="+", default=["xmlrpc", "jsonrpc"])
+    parser.add_argument("--output", help="Fichier JSON où enregistrer les résultats")
+    args = parser.parse_args()
+
+    fake = start_process(["fake_odoo_server.py", "--port", str(args.odoo_port),
+                          "--latency", str(args.latency), "--jitter", str(args.jitter),
+                          "--error-rate", str(args.error_rate), "--drop-rate", str(args.drop_rate)])
+    odoo_url = f"http://127.0.0.1:{args.odoo_port}"
+    results = {}
+    try:
+        mix = ", ".join(f"{name}={weight:g}" for name, weight in args.mix.items())
+        print(f"📊 {args.requests} requêtes ({mix}), {args.concurrency} en parallèle, "
+              f"latence Odoo {args.latency * 1000:.0f} ms (+{args.jitter * 1000:.0f} ms), "
+              f"erreurs {args.error_rate:.1%}, coupures {args.drop_rate:.1%}")
+        for transport in args.transports:
+            result = results[transport] = benchmark_transport(transport, odoo_url, args.api_port, args)
+            print(f"- {transport:8} {result['rps']:8.1f} req/s  p50 {result['p50_ms']:7.1f} ms  "
+                  f"p95 {result['p95_ms']:7.1f} ms  p99 {result['p99_ms']:7.1f} ms  "
+                  f"erreurs {result['errors']}")
+            for name, operation in result["operations"].items():
+                print(f"    {name:7} {operation['requests']:6} req  p50 {operation['p50_ms']:7.1f} ms  "
+                      f"p95 {operation['p95_ms']:7.1f} ms  p99 {operation['p99_ms']:7.1f} ms  "
+                      f"erreurs {operation['errors']}")
+    finally:
+        fake.terminate()
+        fake.wait()
+
+    if args.output:
+        report = {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "config": {
+                "requests": args.requests,
+                "concurrency": args.concurrency,
+                "mix": args.mix,
+                "seed_users": args.seed_users,
+                "latency": args.latency,
+                "jitter": args.jitter,
+                "error_rate": args.error_rate,
+                "drop_rate": args.drop_rate,
+            },
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"💾 Résultats enregistrés dans {args.output}")
+
+
+if __name__ == "__main__":
+    main()
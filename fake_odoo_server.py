@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Serveur Odoo factice pour les tests et les mesures de performance de l'API
+
+Implémente en mémoire le sous-ensemble de l'API RPC d'Odoo utilisé par le
+projet (XML-RPC /xmlrpc/2/* et JSON-RPC /jsonrpc) sur les modèles res.users
+et res.groups, avec une latence simulée réglable et des pannes injectées
+(erreurs serveur, connexions coupées) sur les appels execute_kw.
+
+Usage:
+    python3 fake_odoo_server.py --port 8069 --latency 0.02
+    python3 fake_odoo_server.py --port 8069 --latency 0.02 --jitter 0.01 --error-rate 0.01
+
+Auteur: Système IAM Odoo
+Date: 2025-05-28
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import xmlrpc.client
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, List, Dict, Any
+
+DEFAULT_GROUPS = [
+    ("Internal User", "User types", "base.group_user"),
+    ("Administration / Settings", "Administration", "base.group_system"),
+    ("Ventes", "Sales", "sales_team.group_sale_salesman"),
+    ("Comptabilité", "Accounting", "account.group_account_user"),
+    ("Ressources Humaines", "Human Resources", "hr.group_hr_user"),
+]
+
+
+class FakeOdooError(Exception):
+    """Erreur métier renvoyée par le serveur factice (équivalent UserError Odoo)"""
+
+
+class FakeOdoo:
+    """Base de données Odoo minimale en mémoire"""
+
+    def __init__(self, db: str = "odoo_db", username: str = "admin", password: str = "admin"):
+        self.db = db
+        self.username = username
+        self.password = password
+        self.lock = threading.Lock()
+        self.records: Dict[str, Dict[int, Dict[str, Any]]] = {"res.users": {}, "res.groups": {},
+                                                                "ir.model.data": {}}
+        self.next_id = {"res.users": 1, "res.groups": 1, "ir.model.data": 1}
+        self.calls = 0
+        # Groupes du modèle base.default_user, appliqués si le create ne fixe pas groups_id
+        self.default_user_groups: List[int] = []
+
+        for index, (name, category, xml_id) in enumerate(DEFAULT_GROUPS, start=1):
+            group_id = self._create("res.groups", {"name": name, "comment": "",
+                                                   "category_id": [index, category]})
+            module, xml_name = xml_id.split(".")
+            self._create("ir.model.data", {"module": module, "name": xml_name,
+                                           "model": "res.groups", "res_id": group_id})
+        self._create("res.users", {"name": "Administrator", "login": username,
+                                   "email": "admin@example.com"})
+
+    # Service "common"
+
+    def authenticate(self, db, login, password, user_agent_env=None):
+        if db == self.db and login == self.username and password == self.password:
+            return self.login_index()[login]
+        return False
+
+    def version(self):
+        return {"server_version": "17.0", "server_serie": "17.0", "protocol_version": 1}
+
+    def login_index(self) -> Dict[str, int]:
+        return {rec["login"]: rec_id for rec_id, rec in self.records["res.users"].items()}
+
+    # Service "object"
+
+    def execute_kw(self, db, uid, password, model, method, args=None, kwargs=None):
+        if db != self.db or password != self.password or not uid:
+            raise FakeOdooError("Access Denied")
+        if model not in self.records:
+            raise FakeOdooError(f"Object {model} doesn't exist")
+        handler = getattr(self, f"_rpc_{method}", None)
+        if handler is None:
+            raise FakeOdooError(f"The method '{method}' does not exist on the model '{model}'")
+        with self.lock:
+            self.calls += 1
+            return handler(model, *(args or []), **(kwargs or {}))
+
+    def _rpc_create(self, model, vals_list):
+        if isinstance(vals_list, dict):
+            return self._create(model, vals_list)
+        # Comme Odoo, un create multiple est atomique: tout est validé avant d'écrire
+        logins = set(self.login_index())
+        for vals in vals_list:
+            self._check_create(model, vals, logins)
+            logins.add(vals.get("login"))
+        return [self._create(model, vals) for vals in vals_list]
+
+    def _rpc_read(self, model, ids, fields=None, context=None):
+        ids = [ids] if isinstance(ids, int) else ids
+        return [self._export(model, rec_id, fields)
+                for rec_id in ids if rec_id in self.records[model]]
+
+    def _rpc_write(self, model, ids, vals, context=None):
+        ids = [ids] if isinstance(ids, int) else ids
+        for rec_id in ids:
+            if rec_id not in self.records[model]:
+                raise FakeOdooError(f"Record {model}({rec_id}) does not exist")
+        for rec_id in ids:
+            self._apply(model, rec_id, vals)
+        return True
+
+    def _rpc_unlink(self, model, ids):
+        ids = [ids] if isinstance(ids, int) else ids
+        for rec_id in ids:
+            self.records[model].pop(rec_id, None)
+        return True
+
+    def _rpc_default_get(self, model, fields_list, context=None):
+        if model == "res.users" and "groups_id" in fields_list:
+            return {"groups_id": [(6, 0, list(self.default_user_groups))]}
+        return {}
+
+    def _rpc_search(self, model, domain, offset=0, limit=None, order=None, context=None):
+        return self._search(model, domain, offset, limit, order)
+
+    def _rpc_search_read(self, model, domain=None, fields=None, offset=0, limit=None, order=None,
+                         context=None):
+        return [self._export(model, rec_id, fields)
+                for rec_id in self._search(model, domain or [], offset, limit, order)]
+
+    def _rpc_search_count(self, model, domain, context=None):
+        return len(self._search(model, domain))
+
+    # Stockage
+
+    def _check_create(self, model, vals, logins):
+        if model == "res.users":
+            if not vals.get("login"):
+                raise FakeOdooError("Le champ 'login' est obligatoire")
+            if vals["login"] in logins:
+                raise FakeOdooError("You can not have two users with the same login !")
+
+    def _create(self, model, vals):
+        self._check_create(model, vals, self.login_index())
+        rec_id = self.next_id[model]
+        self.next_id[model] += 1
+        base = {"id": rec_id, "active": True}
+        if model == "res.users":
+            base["groups_id"] = [] if "groups_id" in vals else list(self.default_user_groups)
+        self.records[model][rec_id] = base
+        self._apply(model, rec_id, vals)
+        return rec_id
+
+    def _apply(self, model, rec_id, vals):
+        rec = self.records[model][rec_id]
+        for field, value in vals.items():
+            if field == "groups_id":
+                rec["groups_id"] = self._apply_commands(rec.get("groups_id", []), value)
+            elif field != "password":
+                rec[field] = value
+        rec["write_date"] = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+
+    def _apply_commands(self, current: List[int], commands) -> List[int]:
+        ids = list(current)
+        for command in commands or []:
+            code = command[0]
+            if code == 6:
+                ids = list(command[2])
+            elif code == 4 and command[1] not in ids:
+                ids.append(command[1])
+            elif code == 3 and command[1] in ids:
+                ids.remove(command[1])
+            elif code == 5:
+                ids = []
+        return [group_id for group_id in ids if group_id in self.records["res.groups"]]
+
+    def _export(self, model, rec_id, fields=None):
+        rec = self.records[model][rec_id]
+        fields = fields or [f for f in rec if f != "id"]
+        result = {"id": rec_id}
+        for field in fields:
+            if model == "res.groups" and field == "users":
+                # Champ inverse de res.users.groups_id
+                result[field] = [user_id for user_id, user in self.records["res.users"].items()
+                                 if rec_id in user.get("groups_id", [])]
+            else:
+                result[field] = rec.get(field, False)
+        return result
+
+    def _search(self, model, domain, offset=0, limit=None, order=None) -> List[int]:
+        records = self.records[model]
+        ids = [rec_id for rec_id, rec in records.items()
+               if all(self._match(rec, leaf) for leaf in domain if isinstance(leaf, (list, tuple)))]
+        ids.sort()
+        # Tri multi-critères ("write_date asc, id asc"): tris stables du dernier au premier
+        for term in reversed([term.split() for term in (order or "").split(",") if term.strip()]):
+            field, descending = term[0], len(term) > 1 and term[1].lower() == "desc"
+            if field == "id":
+                ids.sort(reverse=descending)
+            else:
+                ids.sort(key=lambda rec_id: records[rec_id].get(field) or "", reverse=descending)
+        ids = ids[offset or 0:]
+        return ids[:limit] if limit else ids
+
+    @staticmethod
+    def _match(rec, leaf) -> bool:
+        field, operator, value = leaf
+        current = rec.get(field, False)
+        if operator == "=":
+            return current == value
+        if operator == "!=":
+            return current != value
+        if operator == "in":
+            return current in value
+        if operator == "not in":
+            return current not in value
+        if operator == ">":
+            return current is not False and current > value
+        if operator == ">=":
+            return current is not False and current >= value
+        if operator == "<":
+            return current is not False and current < value
+        if operator == "<=":
+            return current is not False and current <= value
+        if operator == "ilike":
+            return str(value).lower() in str(current or "").lower()
+        if operator == "=ilike":
+            return str(value).lower() == str(current or "").lower()
+        raise FakeOdooError(f"Opérateur de domaine non supporté: {operator}")
+
+
+class FakeOdooHandler(BaseHTTPRequestHandler):
+    """Traduit les requêtes XML-RPC et JSON-RPC en appels sur FakeOdoo"""
+
+    protocol_version = "HTTP/1.1"  # Connexions keep-alive comme un vrai Odoo
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _dispatch(self, service: str, method: str, args: List[Any]):
+        server = self.server
+        time.sleep(server.latency + random.uniform(0, server.jitter))
+        target = server.odoo
+        if service == "common" and method in ("authenticate", "version"):
+            return getattr(target, method)(*args)
+        if service == "object" and method == "execute_kw":
+            if random.random() < server.error_rate:
+                server.injected_errors += 1
+                raise FakeOdooError("Erreur serveur simulée")
+            return target.execute_kw(*args)
+        raise FakeOdooError(f"Méthode inconnue: {service}.{method}")
+
+    def _drop(self) -> bool:
+        """Coupe la connexion sans répondre (panne réseau simulée)"""
+        if self.server.drop_rate and random.random() < self.server.drop_rate:
+            self.server.dropped_connections += 1
+            self.close_connection = True
+            return True
+        return False
+
+    def _jsonrpc(self, request) -> Dict[str, Any]:
+        request_id = request.get("id") if isinstance(request, dict) else None
+        try:
+            if not isinstance(request, dict):
+                raise FakeOdooError("Requête JSON-RPC invalide")
+            params = request.get("params", {})
+            result = self._dispatch(params.get("service"), params.get("method"), params.get("args", []))
+            return {"jsonrpc": "2.0", "id": request_id, "result": result}
+        except Exception as e:
+            return {"jsonrpc": "2.0", "id": request_id, "error": {
+                "code": 200, "message": "Odoo Server Error",
+                "data": {"name": type(e).__name__, "message": str(e)}}}
+
+    def _send(self, body: bytes, content_type: str):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        raw = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if b"execute_kw" in raw and self._drop():
+            return
+
+        if self.path == "/jsonrpc":
+            request = json.loads(raw)
+            if isinstance(request, list) and self.server.jsonrpc_batch:
+                payload = [self._jsonrpc(item) for item in request]
+            else:
+                # Comme Odoo, un tableau JSON-RPC 2.0 est refusé en entier par défaut
+                payload = self._jsonrpc(request)
+            self._send(json.dumps(payload).encode(), "application/json")
+
+        elif self.path.startswith("/xmlrpc/2/"):
+            args, method = xmlrpc.client.loads(raw, use_builtin_types=True)
+            try:
+                result = self._dispatch(self.path.rsplit("/", 1)[-1], method, list(args))
+                body = xmlrpc.client.dumps((result,), methodresponse=True, allow_none=True)
+            except Exception as e:
+                body = xmlrpc.client.dumps(xmlrpc.client.Fault(1, str(e)), allow_none=True)
+            self._send(body.encode(), "text/xml")
+
+        else:
+            self.send_error(404)
+
+
+class FakeOdooServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # Accepte les rafales de connexions du benchmark
+
+
+def start_server(host: str = "127.0.0.1", port: int = 8069, latency: float = 0.0,
+                 odoo: Optional[FakeOdoo] = None, jitter: float = 0.0,
+                 error_rate: float = 0.0, drop_rate: float = 0.0,
+                 jsonrpc_batch: bool = False) -> FakeOdooServer:
+    """
+    Démarre le serveur factice dans un thread et le renvoie.
+    Chaque appel attend `latency` plus un délai aléatoire d'au plus `jitter`
+    secondes; une proportion `error_rate` des execute_kw échoue avec une
+    erreur Odoo et une proportion `drop_rate` voit sa connexion coupée.
+    Avec `jsonrpc_batch`, les tableaux JSON-RPC 2.0 sont acceptés (Odoo les refuse).
+    """
+    server = FakeOdooServer((host, port), FakeOdooHandler)
+    server.odoo = odoo or FakeOdoo()
+    server.latency = latency
+    server.jitter = jitter
+    server.error_rate = error_rate
+    server.drop_rate = drop_rate
+    server.jsonrpc_batch = jsonrpc_batch
+    server.injected_errors = 0
+    server.dropped_connections = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serveur Odoo factice (XML-RPC / JSON-RPC)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8069)
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Latence simulée par appel RPC, en secondes")
+    parser.add_argument("--jitter", type=float, default=0.0,
+                        help="Délai aléatoire supplémentaire maximum par appel, en secondes")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Proportion des execute_kw en erreur serveur (0 à 1)")
+    parser.add_argument("--drop-rate", type=float, default=0.0,
+                        help="Proportion des execute_kw dont la connexion est coupée (0 à 1)")
+    parser.add_argument("--jsonrpc-batch", action="store_true",
+                        help="Accepter les tableaux JSON-RPC 2.0 (refusés par Odoo)")
+    args = parser.parse_args()
+
+    server = start_server(args.host, args.port, args.latency, jitter=args.jitter,
+                          error_rate=args.error_rate, drop_rate=args.drop_rate,
+                          jsonrpc_batch=args.jsonrpc_batch)
+    print(f"🧪 Serveur Odoo factice sur http://{args.host}:{args.port} "
+          f"(latence {args.latency * 1000:.0f} ms, gigue {args.jitter * 1000:.0f} ms, "
+          f"erreurs {args.error_rate:.1%}, coupures {args.drop_rate:.1%})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,36 +1,60 @@
 import React, { useState, useEffect } from 'react';
 import axios from 'axios';
 
+// Utilisateurs par page (pagination par curseur côté serveur)
+const PAGE_SIZE = 100;
+
 const UserList: React.FC = () => {
   const [users, setUsers] = useState<any[]>([]);
   const [loading, setLoading] = useState(true);
   const [message, setMessage] = useState<{ type: 'success' | 'error'; text: string } | null>(null);
   const [searchTerm, setSearchTerm] = useState('');
   const [selectedUser, setSelectedUser] = useState<any>(null);
+  // Curseurs "after" des pages parcourues (le dernier est celui de la page affichée)
+  const [cursors, setCursors] = useState<number[]>([0]);
+  const [nextCursor, setNextCursor] = useState<number | null>(null);
 
   useEffect(() => {
-    fetchUsers();
+    fetchPage(0);
   }, []);
 
-  const fetchUsers = async () => {
+  // Seule la page affichée est chargée: les suivantes sont lues à la demande
+  const fetchPage = async (after: number): Promise<boolean> => {
     try {
       setLoading(true);
-      // Note: Cette route n'existe pas dans l'API, on pourrait l'ajouter
-      // Pour l'instant, on simule avec une liste vide ou on peut récupérer les groupes
-      const response = await axios.get('/groups/');
-      // Simulation de données utilisateurs pour la démo
-      setUsers([]);
+      const response = await axios.get('/users/', {
+        params: { after, limit: PAGE_SIZE }
+      });
+      setUsers(response.data.users);
+      setNextCursor(response.data.next_cursor);
       setMessage({ type: 'success', text: 'Liste des utilisateurs chargée' });
+      return true;
     } catch (error: any) {
       setMessage({
         type: 'error',
         text: error.response?.data?.detail || 'Erreur lors du chargement des utilisateurs'
       });
+      return false;
     } finally {
       setLoading(false);
     }
   };
 
+  const refreshPage = () => fetchPage(cursors[cursors.length - 1]);
+
+  const goToNextPage = async () => {
+    if (nextCursor !== null && await fetchPage(nextCursor)) {
+      setCursors([...cursors, nextCursor]);
+    }
+  };
+
+  const goToPreviousPage = async () => {
+    const previous = cursors.slice(0, -1);
+    if (previous.length > 0 && await fetchPage(previous[previous.length - 1])) {
+      setCursors(previous);
+    }
+  };
+
   const getUserDetails = async (userId: number) => {
     try {
       const response = await axios.get(`/users/${userId}`);
@@ -77,7 +101,7 @@ const UserList: React.FC = () => {
               <input
                 type="text"
                 className="form-control"
-                placeholder="Rechercher un utilisateur..."
+                placeholder="Rechercher dans la page..."
                 value={searchTerm}
                 onChange={(e) => setSearchTerm(e.target.value)}
               />
@@ -86,7 +110,7 @@ const UserList: React.FC = () => {
           <div className="col-md-6 text-end">
             <button
               className="btn btn-outline-primary"
-              onClick={fetchUsers}
+              onClick={refreshPage}
               disabled={loading}
             >
               {loading ? (
@@ -202,6 +226,27 @@ const UserList: React.FC = () => {
                 </table>
               </div>
             )}
+
+            {/* Pagination */}
+            <div className="d-flex justify-content-between align-items-center">
+              <button
+                className="btn btn-outline-secondary"
+                onClick={goToPreviousPage}
+                disabled={cursors.length < 2}
+              >
+                <i className="fas fa-chevron-left me-2"></i>
+                Précédent
+              </button>
+              <span className="text-muted">Page {cursors.length}</span>
+              <button
+                className="btn btn-outline-secondary"
+                onClick={goToNextPage}
+                disabled={nextCursor === null}
+              >
+                Suivant
+                <i className="fas fa-chevron-right ms-2"></i>
+              </button>
+            </div>
           </>
         )}
 
@@ -271,7 +316,7 @@ const UserList: React.FC = () => {
           <div className="col-md-3">
             <div className="card bg-primary text-white">
               <div className="card-body text-center">
-                <h5 className="card-title">Total Utilisateurs</h5>
+                <h5 className="card-title">Utilisateurs (page)</h5>
                 <h2 className="card-text">{users.length}</h2>
               </div>
             </div>
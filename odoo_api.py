@@ -7,33 +7,278 @@ Auteur: Système IAM Odoo
 Date: 2025-05-28
 """
 
-import xmlrpc.client
+import asyncio
+import hashlib
+import json
+import math
+import os
 import random
 import string
-from fastapi import FastAPI, HTTPException, status
+import tempfile
+import xmlrpc.client
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple, Callable, Awaitable, Union
 import logging
 from datetime import datetime
 
-# Configuration Odoo
-ODOO_URL = "http://localhost:8069"
-ODOO_DB = "odoo_db"
-ODOO_USERNAME = "admin"
-ODOO_PASSWORD = "admin"  # Mot de passe par défaut Odoo
+from odoo_rpc import (OdooConnectionPool, ThreadedOdooClient, AsyncOdooClient, OdooSessionMonitor,
+                      AdaptiveConcurrencyLimiter, CircuitBreaker, OdooCallGuard, OdooRPCError)
+from odoo_cache import (GroupCatalogue, GroupExternalIds, GroupIndex, SharedStore, UnresolvedGroupsError,
+                         UserCache, compute_etag, etag_matches)
+from odoo_changes import ChangeFeed, ChangeFeedPoller
+from odoo_idempotency import IdempotencyStore, IdempotencyConflict, IdempotencyInProgress
+from odoo_jobs import JobStore, JobWorkerPool, JobContext
+from odoo_metrics import (MetricsRegistry, MetricsMiddleware, RPCMetrics, TimedJSONResponse,
+                          merge_snapshots, render_prometheus)
+
+# Configuration Odoo (surchargeable par variables d'environnement)
+ODOO_URL = os.environ.get("ODOO_URL", "http://localhost:8069")
+ODOO_DB = os.environ.get("ODOO_DB", "odoo_db")
+ODOO_USERNAME = os.environ.get("ODOO_USERNAME", "admin")
+ODOO_PASSWORD = os.environ.get("ODOO_PASSWORD", "admin")  # Mot de passe par défaut Odoo
+
+# Client RPC partagé par les endpoints
+ODOO_TRANSPORT = os.environ.get("ODOO_TRANSPORT", "jsonrpc")  # "jsonrpc" (asynchrone) ou "xmlrpc" (pool de threads)
+ODOO_POOL_SIZE = 20  # Connexions keep-alive simultanées vers Odoo (mode xmlrpc)
+ODOO_MAX_CONNECTIONS = 200  # Appels simultanés vers Odoo (mode jsonrpc)
+ODOO_TIMEOUT = 30.0  # Délai maximum (secondes) d'un appel RPC
+ODOO_RECONNECT_MAX_BACKOFF = 30.0  # Délai maximum (secondes) entre deux tentatives de connexion
+ODOO_HEALTH_CHECK_INTERVAL = 60.0  # Revérification périodique de l'authentification (secondes)
+
+# Protection d'Odoo en cas de saturation
+ODOO_INITIAL_CONCURRENCY = 10  # Appels simultanés autorisés au démarrage (limite adaptée ensuite)
+ODOO_MIN_CONCURRENCY = 2  # Limite plancher du limiteur adaptatif
+ODOO_MAX_QUEUE_WAIT = 10.0  # Attente maximum (secondes) d'une place avant de répondre 503
+CIRCUIT_FAILURE_THRESHOLD = 0.5  # Proportion d'échecs réseau qui ouvre le circuit
+CIRCUIT_MIN_CALLS = 20  # Appels minimum dans la fenêtre avant d'évaluer le taux d'échec
+CIRCUIT_WINDOW = 30.0  # Fenêtre (secondes) d'observation des échecs
+CIRCUIT_OPEN_DURATION = 5.0  # Durée initiale (secondes) d'ouverture du circuit
+
+# Création d'utilisateurs par lots
+BATCH_CHUNK_SIZE = 100  # Utilisateurs par appel res.users.create
+BATCH_MAX_PARALLEL_CHUNKS = 4  # Lots envoyés simultanément à Odoo
+ROLES_CHUNK_SIZE = 500  # Utilisateurs par appel res.users.write lors des changements de rôles
+ROLES_BULK_MAX_USERS = 20000  # Utilisateurs au plus par appel de POST /roles/assign
+
+# Listing des utilisateurs
+USERS_PAGE_SIZE = 100  # Taille de page par défaut de GET /users/
+USERS_PAGE_MAX = 1000  # Taille de page maximum (et taille des lectures en mode NDJSON)
+USER_LIST_FIELDS = ['name', 'login', 'email', 'active']
+USER_FORBIDDEN_FIELDS = {'password', 'new_password'}
+
+# Cache du catalogue des groupes (tenu à jour par le suivi des modifications, voir plus bas)
+GROUPS_CACHE_TTL = 3600.0  # Durée de validité (secondes) du catalogue en mémoire
+GROUP_FIELDS = ['name', 'category_id', 'comment']
+
+# Cache des fiches utilisateurs (GET /users/{id} et /users/{id}/roles)
+USER_CACHE_SIZE = 10000  # Nombre maximum d'utilisateurs en cache par worker
+USER_CACHE_TTL = 300.0  # Durée de validité (secondes) d'une fiche en cache
+USER_DETAIL_FIELDS = ['name', 'login', 'email', 'active', 'groups_id']
+
+# Suivi des modifications Odoo (write_date) de res.users et res.groups
+CHANGE_FEED_INTERVAL = 5.0  # Intervalle (secondes) entre deux interrogations
+USERS_RECONCILE_INTERVAL = 30.0  # Détection des utilisateurs en cache supprimés
+
+def default_state_path(name: str) -> str:
+    """
+    Fichier SQLite par défaut, propre à l'instance Odoo ciblée (ODOO_URL et
+    ODOO_DB): deux déploiements de l'API sur la même machine ne partagent ni
+    caches, ni tâches, ni clés d'idempotence
+    """
+    instance = hashlib.sha1(f"{ODOO_URL.rstrip('/')}|{ODOO_DB}".encode('utf-8')).hexdigest()[:12]
+    return os.path.join(tempfile.gettempdir(), f"odoo_api_{name}_{instance}.sqlite3")
+
+# Stockage SQLite partagé par les workers (chaîne vide pour le désactiver)
+SHARED_CACHE_PATH = os.environ.get("ODOO_API_CACHE_DB", default_state_path("cache"))
+
+# Tâches de provisionnement asynchrones (POST /users/full, GET /jobs/{id})
+JOBS_DB_PATH = os.environ.get("ODOO_API_JOBS_DB", default_state_path("jobs"))
+JOBS_WORKERS = 4  # Tâches exécutées simultanément par worker de l'API
+JOBS_MAX_ATTEMPTS = 5  # Tentatives avant d'abandonner une tâche (Odoo injoignable)
+JOBS_RETENTION = 7 * 24 * 3600.0  # Conservation (secondes) des tâches terminées
+
+# Clés d'idempotence (en-tête Idempotency-Key de POST /users/ et /users/full)
+IDEMPOTENCY_DB_PATH = os.environ.get("ODOO_API_IDEMPOTENCY_DB", default_state_path("idempotency"))
+IDEMPOTENCY_TTL = 24 * 3600.0  # Durée (secondes) pendant laquelle une réponse est rejouée
+IDEMPOTENCY_MASKED_FIELDS = ("password",)  # Renvoyés à la première réponse, masqués dans les rejeux
+
+# Métriques Prometheus (GET /metrics)
+METRICS_PUBLISH_INTERVAL = 5.0  # Publication des métriques du worker dans le stockage partagé (secondes)
+METRICS_STALE_AFTER = 60.0  # Métriques ignorées d'un worker qui ne publie plus (secondes)
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def build_odoo_client(transport: str = ODOO_TRANSPORT):
+    """Construit le client RPC asynchrone correspondant au transport choisi"""
+    if transport == "xmlrpc":
+        pool = OdooConnectionPool(
+            ODOO_URL, ODOO_DB, ODOO_USERNAME, ODOO_PASSWORD,
+            pool_size=ODOO_POOL_SIZE, timeout=ODOO_TIMEOUT
+        )
+        return ThreadedOdooClient(pool)
+    return AsyncOdooClient(
+        ODOO_URL, ODOO_DB, ODOO_USERNAME, ODOO_PASSWORD,
+        max_connections=ODOO_MAX_CONNECTIONS, timeout=ODOO_TIMEOUT
+    )
+
+# Métriques du worker
+metrics_registry = MetricsRegistry()
+METRICS_KEY = f"metrics:{os.getpid()}"
+
+def odoo_unavailable(reason: str, retry_after: float) -> HTTPException:
+    """Réponse 503 renvoyée sans appeler Odoo (circuit ouvert ou Odoo saturé)"""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=f"Service Odoo non disponible: {reason}",
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+# Connexion Odoo (établie en tâche de fond, voir lifespan)
+odoo = build_odoo_client()
+odoo.metrics = RPCMetrics(metrics_registry)
+odoo.guard = OdooCallGuard(
+    AdaptiveConcurrencyLimiter(
+        initial_limit=ODOO_INITIAL_CONCURRENCY, min_limit=ODOO_MIN_CONCURRENCY,
+        max_limit=ODOO_POOL_SIZE if ODOO_TRANSPORT == "xmlrpc" else ODOO_MAX_CONNECTIONS,
+        max_wait=ODOO_MAX_QUEUE_WAIT
+    ),
+    CircuitBreaker(
+        failure_threshold=CIRCUIT_FAILURE_THRESHOLD, min_calls=CIRCUIT_MIN_CALLS,
+        window=CIRCUIT_WINDOW, open_duration=CIRCUIT_OPEN_DURATION
+    ),
+    rejection=odoo_unavailable
+)
+odoo_session = OdooSessionMonitor(
+    odoo, max_backoff=ODOO_RECONNECT_MAX_BACKOFF, check_interval=ODOO_HEALTH_CHECK_INTERVAL
+)
+
+async def load_groups() -> List[Dict[str, Any]]:
+    """Charge le catalogue complet des groupes depuis Odoo"""
+    return await odoo.execute_kw(
+        'res.groups', 'search_read',
+        [[]], {'fields': GROUP_FIELDS}
+    )
+
+async def load_group_external_ids() -> List[Dict[str, Any]]:
+    """Charge les identifiants externes (XML ids) des groupes depuis Odoo"""
+    return await odoo.execute_kw(
+        'ir.model.data', 'search_read',
+        [[('model', '=', 'res.groups')]], {'fields': ['module', 'name', 'res_id']}
+    )
+
+shared_store = SharedStore(SHARED_CACHE_PATH) if SHARED_CACHE_PATH else None
+group_catalogue = GroupCatalogue(load_groups, ttl=GROUPS_CACHE_TTL, store=shared_store)
+group_external_ids = GroupExternalIds(load_group_external_ids, ttl=GROUPS_CACHE_TTL, store=shared_store)
+group_index = GroupIndex(group_catalogue, group_external_ids)
+user_cache = UserCache(max_size=USER_CACHE_SIZE, ttl=USER_CACHE_TTL, store=shared_store)
+
+async def load_user(user_id: int) -> Optional[Dict[str, Any]]:
+    """Lit la fiche d'un utilisateur dans Odoo (None s'il n'existe pas)"""
+    users = await odoo.execute_kw(
+        'res.users', 'read',
+        [user_id], {'fields': USER_DETAIL_FIELDS}
+    )
+    return users[0] if users else None
+
+async def on_users_changed(changed: List[int], removed: List[int], initial: bool):
+    if not initial:
+        await user_cache.invalidate(changed + removed)
+
+async def on_groups_changed(changed: List[int], removed: List[int], initial: bool):
+    group_catalogue.set([
+        {field: value for field, value in group.items() if field != 'write_date'}
+        for _, group in sorted(groups_feed.snapshot.items())
+    ])
+    if not initial:
+        await invalidate_group_members(changed, removed)
+
+async def invalidate_group_members(changed: List[int], removed: List[int]):
+    """
+    Invalide les utilisateurs en cache dont l'appartenance aux groupes
+    modifiés ou supprimés a pu changer: modifier les membres depuis le groupe
+    ne change que la write_date du groupe, pas celle des utilisateurs
+    """
+    members: Dict[int, set] = {}
+    if changed:
+        groups = await odoo.execute_kw('res.groups', 'read', [changed], {'fields': ['users']})
+        members = {group['id']: set(group['users']) for group in groups}
+    gone = set(removed) | (set(changed) - set(members))
+    cached = user_cache.records()
+    # Une lecture en cours a pu précéder la modification des membres
+    affected = {user_id for user_id in user_cache.tracked_ids() if user_id not in cached}
+    for user_id, user in cached.items():
+        user_groups = set(user['groups_id'])
+        if user_groups & gone or any((group_id in user_groups) != (user_id in user_ids)
+                                     for group_id, user_ids in members.items()):
+            affected.add(user_id)
+    if affected:
+        await user_cache.invalidate(affected)
+
+# Seules les fiches en cache sont suivies: res.users n'est pas recopié dans chaque worker
+users_feed = ChangeFeed(odoo, 'res.users', [], mirror=False, tracked=user_cache.tracked_ids,
+                        reconcile_interval=USERS_RECONCILE_INTERVAL, on_change=on_users_changed)
+groups_feed = ChangeFeed(odoo, 'res.groups', GROUP_FIELDS, on_change=on_groups_changed)
+change_feed = ChangeFeedPoller(
+    [users_feed, groups_feed], interval=CHANGE_FEED_INTERVAL, ready=lambda: odoo_session.connected
+)
+
+async def invalidate_users(user_ids: List[int]):
+    """Écarte des caches les utilisateurs modifiés par l'API"""
+    users_feed.forget(user_ids)
+    await user_cache.invalidate(user_ids)
+
+job_store = JobStore(JOBS_DB_PATH)
+idempotency_store = IdempotencyStore(IDEMPOTENCY_DB_PATH, ttl=IDEMPOTENCY_TTL)
+job_workers = None  # JobWorkerPool, créé après la définition des traitements (voir plus bas)
+
+async def publish_metrics():
+    """Publie périodiquement les métriques du worker pour GET /metrics"""
+    while True:
+        await asyncio.sleep(METRICS_PUBLISH_INTERVAL)
+        try:
+            shared_store.put(METRICS_KEY, metrics_registry.snapshot())
+        except Exception as e:
+            logger.warning(f"Publication des métriques impossible: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Connexion Odoo en tâche de fond: le worker démarre sans attendre Odoo
+    et se reconnecte seul si Odoo redevient disponible
+    """
+    odoo_session.start()
+    publisher = asyncio.create_task(publish_metrics()) if shared_store is not None else None
+    job_store.purge(JOBS_RETENTION)
+    idempotency_store.purge()
+    job_workers.start()
+    change_feed.start()
+    yield
+    await change_feed.stop()
+    await job_workers.stop()
+    if publisher is not None:
+        publisher.cancel()
+        shared_store.delete(METRICS_KEY)
+    await odoo_session.stop()
+    await odoo.aclose()
+
 # Initialisation FastAPI
 app = FastAPI(
     title="API de Provisionnement Odoo",
     description="API pour créer, modifier et supprimer des comptes utilisateurs dans Odoo",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=TimedJSONResponse
 )
 
+# Durée des requêtes par route et temps d'encodage des réponses
+app.add_middleware(MetricsMiddleware, registry=metrics_registry)
+
 # Configuration CORS pour permettre les requêtes depuis React
 app.add_middleware(
     CORSMiddleware,
@@ -43,18 +288,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Connexion Odoo
-try:
-    common = xmlrpc.client.ServerProxy(f"{ODOO_URL}/xmlrpc/2/common")
-    models = xmlrpc.client.ServerProxy(f"{ODOO_URL}/xmlrpc/2/object")
-    uid = common.authenticate(ODOO_DB, ODOO_USERNAME, ODOO_PASSWORD, {})
-    if not uid:
-        raise Exception("Erreur d'authentification Odoo")
-    logger.info(f"Connexion Odoo réussie - UID: {uid}")
-except Exception as e:
-    logger.error(f"Erreur de connexion Odoo: {e}")
-    uid = None
-
 # Modèles Pydantic pour la validation des données
 
 class AccountAdditionalIds(BaseModel):
@@ -78,22 +311,31 @@ class GroupInfo(BaseModel):
     external_name: str
     other_ids: GroupAdditionalIds
 
+# Groupe désigné par son ID, son nom ("Sales / User") ou son identifiant externe ("base.group_user")
+GroupRef = Union[int, str]
+
 class CreateUserRequest(BaseModel):
     user_account: UserAccount
     name: Optional[str] = None
     email: Optional[EmailStr] = None
     password: Optional[str] = None
-    groups: Optional[List[int]] = []
+    groups: Optional[List[GroupRef]] = []
 
 class UpdateUserRequest(BaseModel):
     name: Optional[str] = None
     login: Optional[str] = None
     email: Optional[EmailStr] = None
     password: Optional[str] = None
-    groups: Optional[List[int]] = None
+    groups: Optional[List[GroupRef]] = None
 
 class AssignRolesRequest(BaseModel):
-    groups: List[int]
+    groups: List[GroupRef]
+    user_ids: List[int] = []  # Autres utilisateurs recevant la même modification
+
+class BulkRolesRequest(BaseModel):
+    users: List[Union[int, str]]  # IDs ou logins
+    add: List[GroupRef] = []
+    remove: List[GroupRef] = []
 
 # Fonctions utilitaires
 
@@ -114,66 +356,338 @@ def generate_password(length: int = 12) -> str:
         
     return password
 
+async def resolve_groups(refs: List[GroupRef]) -> List[int]:
+    """Convertit les noms et identifiants externes de groupes en IDs (index en mémoire)"""
+    try:
+        return await group_index.resolve(refs)
+    except UnresolvedGroupsError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail={"message": "Groupes non résolus", "groups": e.errors}
+        )
+
+def build_user_values(request: CreateUserRequest) -> Dict[str, Any]:
+    """Construit les valeurs res.users à partir d'une requête de création"""
+    login_name = request.user_account.login_name
+    groups = request.groups or []
+
+    user_data = {
+        'name': request.user_account.other_ids.display_name or request.name or login_name,
+        'login': login_name,
+        'email': request.email or login_name,
+        'password': request.password or generate_password(),
+        'active': True,
+        'groups_id': [(6, 0, groups)] if groups else []
+    }
+
+    # Ajout des métadonnées si disponibles
+    if request.user_account.other_ids.up_id:
+        user_data['employee_id'] = request.user_account.other_ids.up_id
+
+    return user_data
+
+async def run_idempotent(idempotency_key: Optional[str], endpoint: str, request: BaseModel,
+                         status_code: int, response: Response,
+                         action: Callable[[], Awaitable[Dict[str, Any]]]) -> Any:
+    """
+    Exécute `action` une seule fois par clé d'idempotence.
+    Une répétition rejoue la réponse enregistrée sans appeler Odoo; une
+    répétition concurrente attend la fin de la première requête (dont le bail
+    est prolongé tant qu'elle s'exécute). Les erreurs serveur (5xx) ne sont
+    pas enregistrées: la requête peut être retentée. Le mot de passe généré
+    n'est pas enregistré: un rejeu le renvoie masqué.
+    """
+    if not idempotency_key:
+        return await action()
+
+    key = f"{endpoint} {idempotency_key}"
+    try:
+        stored = await idempotency_store.begin(key, compute_etag(request.model_dump(mode="json")))
+    except IdempotencyConflict:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Clé d'idempotence déjà utilisée pour une requête différente"
+        )
+    except IdempotencyInProgress:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Une requête avec la même clé d'idempotence est toujours en cours"
+        )
+    if stored is not None:
+        logger.info(f"Réponse rejouée pour la clé d'idempotence {idempotency_key}")
+        return TimedJSONResponse(stored["body"], status_code=stored["status_code"],
+                                 headers={**stored["headers"], "Idempotent-Replayed": "true"})
+
+    lease = asyncio.create_task(idempotency_store.hold(key))
+    try:
+        body = await action()
+    except HTTPException as e:
+        if e.status_code < 500:
+            await asyncio.to_thread(idempotency_store.finish, key, e.status_code, {"detail": e.detail})
+        else:
+            await asyncio.to_thread(idempotency_store.release, key)
+        raise
+    except BaseException:
+        await asyncio.shield(asyncio.to_thread(idempotency_store.release, key))
+        raise
+    finally:
+        lease.cancel()
+    stored = dict(body)
+    for field in IDEMPOTENCY_MASKED_FIELDS:
+        if stored.get(field) not in (None, "***"):
+            stored[field] = "***"
+    await asyncio.to_thread(idempotency_store.finish, key, status_code, stored, dict(response.headers))
+    return body
+
+# Erreurs renvoyées par Odoo lui-même: la transaction a été annulée, rien n'a été créé
+ODOO_APPLICATION_ERRORS = (OdooRPCError, xmlrpc.client.Fault)
+
+class CreationOutcomeUnknown(Exception):
+    """Création interrompue par une erreur réseau: Odoo a pu la valider malgré tout"""
+
+async def create_users_chunk(items: List[Tuple[int, Dict[str, Any]]]) -> Dict[int, Any]:
+    """
+    Crée un lot d'utilisateurs en un seul appel res.users.create.
+    Odoo annule tout le lot si un enregistrement est refusé: le lot est alors
+    coupé en deux jusqu'à isoler les enregistrements fautifs. Après une
+    erreur réseau, le lot n'est jamais renvoyé (il a pu être créé): ses
+    entrées reçoivent CreationOutcomeUnknown.
+    Retourne l'ID créé ou l'exception rencontrée pour chaque index.
+    """
+    try:
+        user_ids = await odoo.execute_kw(
+            'res.users', 'create',
+            [[values for _, values in items]]
+        )
+        return {index: user_id for (index, _), user_id in zip(items, user_ids)}
+    except HTTPException as e:
+        # Appel refusé sans solliciter Odoo (disjoncteur, saturation): rien n'a été créé
+        return {index: e for index, _ in items}
+    except ODOO_APPLICATION_ERRORS as e:
+        if len(items) == 1:
+            return {items[0][0]: e}
+        middle = len(items) // 2
+        first_half = await create_users_chunk(items[:middle])
+        second_half = await create_users_chunk(items[middle:])
+        return {**first_half, **second_half}
+    except Exception as e:
+        error = CreationOutcomeUnknown(
+            f"Résultat inconnu après une erreur réseau ({str(e) or type(e).__name__}), "
+            f"vérifier l'existence du login avant de réessayer"
+        )
+        return {index: error for index, _ in items}
+
+async def find_missing_users(user_ids: List[int]) -> List[int]:
+    """Retourne les IDs qui ne correspondent à aucun utilisateur (actif ou archivé)"""
+    existing = await odoo.execute_kw(
+        'res.users', 'search',
+        [[('id', 'in', user_ids)]], {'context': {'active_test': False}}
+    )
+    return sorted(set(user_ids) - set(existing))
+
+async def resolve_users(refs: List[Union[int, str]]) -> Tuple[List[int], List[Union[int, str]]]:
+    """
+    Convertit des IDs ou logins en IDs d'utilisateurs existants (actifs ou
+    archivés), en deux recherches au plus; retourne (IDs, références inconnues)
+    """
+    refs = list(dict.fromkeys(refs))
+    ids = [ref for ref in refs if isinstance(ref, int)]
+    logins = [ref for ref in refs if isinstance(ref, str)]
+    found: Dict[Union[int, str], int] = {}
+    if ids:
+        existing = await odoo.execute_kw(
+            'res.users', 'search',
+            [[('id', 'in', ids)]], {'context': {'active_test': False}}
+        )
+        found.update({user_id: user_id for user_id in existing})
+    if logins:
+        users = await odoo.execute_kw(
+            'res.users', 'search_read',
+            [[('login', 'in', logins)]], {'fields': ['login'], 'context': {'active_test': False}}
+        )
+        found.update({user['login']: user['id'] for user in users})
+    user_ids = list(dict.fromkeys(found[ref] for ref in refs if ref in found))
+    return user_ids, [ref for ref in refs if ref not in found]
+
+async def apply_group_commands(user_ids: List[int], commands: List[Tuple]) -> int:
+    """
+    Applique des commandes many2many sur groups_id ((4, id) ajout, (3, id) retrait).
+    Un seul write par paquet de ROLES_CHUNK_SIZE utilisateurs, sans relecture
+    préalable: Odoo applique les commandes de façon incrémentale, deux appels
+    concurrents ne peuvent donc pas annuler leurs modifications respectives.
+    Retourne le nombre d'appels RPC effectués.
+    """
+    calls = 0
+    for start in range(0, len(user_ids), ROLES_CHUNK_SIZE):
+        chunk = user_ids[start:start + ROLES_CHUNK_SIZE]
+        try:
+            await odoo.execute_kw(
+                'res.users', 'write',
+                [chunk, {'groups_id': commands}]
+            )
+            calls += 1
+        except Exception:
+            await invalidate_users(chunk)  # Écriture peut-être partiellement appliquée
+            # Le write échoue entièrement si un utilisateur n'existe pas
+            missing = await find_missing_users(chunk)
+            if missing:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Utilisateur(s) non trouvé(s): {missing}"
+                )
+            raise
+        # Éviction plutôt que mise à jour: Odoo ajoute aussi les groupes impliqués
+        await invalidate_users(chunk)
+    return calls
+
+def parse_user_fields(fields: Optional[str]) -> List[str]:
+    """Convertit le paramètre fields=a,b,c en liste de champs res.users à lire"""
+    if not fields:
+        return list(USER_LIST_FIELDS)
+    requested = [field.strip() for field in fields.split(',') if field.strip()]
+    forbidden = USER_FORBIDDEN_FIELDS.intersection(requested)
+    if forbidden:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Champs non autorisés: {sorted(forbidden)}"
+        )
+    return requested
+
+async def read_users_page(after: int, fields: List[str], limit: int,
+                          include_inactive: bool = False) -> List[Dict[str, Any]]:
+    """Lit une page d'utilisateurs d'ID strictement supérieur au curseur `after`"""
+    options = {'fields': fields, 'limit': limit, 'order': 'id asc'}
+    if include_inactive:
+        options['context'] = {'active_test': False}
+    return await odoo.execute_kw(
+        'res.users', 'search_read',
+        [[('id', '>', after)]], options
+    )
+
+def parse_id_list(ids: str) -> List[int]:
+    """Convertit le paramètre ids=1,2,3 en liste d'IDs sans doublons"""
+    try:
+        user_ids = list(dict.fromkeys(int(value) for value in ids.split(',') if value.strip()))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Le paramètre ids doit être une liste d'entiers séparés par des virgules"
+        )
+    if len(user_ids) > USERS_PAGE_MAX:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Au plus {USERS_PAGE_MAX} IDs par requête"
+        )
+    return user_ids
+
+async def expand_user_groups(users: List[Dict[str, Any]]):
+    """
+    Ajoute le détail des groupes ('groups') à chaque utilisateur.
+    Les groupes viennent du catalogue en cache; les IDs absents du catalogue
+    sont lus en une seule fois, quel que soit le nombre d'utilisateurs.
+    """
+    group_ids = {group_id for user in users for group_id in user.get('groups_id') or []}
+    catalogue = {group['id']: group for group in await group_catalogue.get()}
+    missing = sorted(group_ids - catalogue.keys())
+    if missing:
+        for group in await odoo.execute_kw(
+            'res.groups', 'read',
+            [missing], {'fields': GROUP_FIELDS}
+        ):
+            catalogue[group['id']] = group
+    for user in users:
+        user['groups'] = [catalogue[group_id] for group_id in user.get('groups_id') or []
+                          if group_id in catalogue]
+
 def validate_odoo_connection():
     """Valide que la connexion Odoo est active"""
-    if not uid:
+    if not odoo_session.connected:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="Service Odoo non disponible"
         )
+    breaker = odoo.guard.breaker
+    if breaker.state == "open" and breaker.retry_after() > 0:
+        raise odoo_unavailable("circuit ouvert après des échecs répétés", breaker.retry_after())
 
 # Endpoints de l'API
 
 @app.get("/")
-def read_root():
+async def read_root():
     """Endpoint racine pour vérifier le statut de l'API"""
     return {
         "message": "API de Provisionnement Odoo",
         "version": "1.0.0",
-        "odoo_connected": uid is not None
+        "odoo_connected": odoo_session.connected
     }
 
 @app.get("/health")
-def health_check():
+async def health_check():
     """Vérification de l'état de santé de l'API"""
+    if not odoo_session.connected:
+        health = "unhealthy"
+    elif odoo.guard.breaker.state != "closed":
+        health = "degraded"
+    else:
+        health = "healthy"
     return {
-        "status": "healthy" if uid else "unhealthy",
-        "odoo_connection": uid is not None,
+        "status": health,
+        "odoo_connection": odoo_session.connected,
+        "odoo_session": odoo_session.stats(),
+        "rpc_client": odoo.stats(),
+        "groups_cache": group_catalogue.stats(),
+        "group_index": group_index.stats(),
+        "users_cache": user_cache.stats(),
+        "change_feed": change_feed.stats(),
+        "jobs": job_workers.stats(),
+        "idempotency": idempotency_store.stats(),
         "timestamp": datetime.now().isoformat()
     }
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Métriques au format texte Prometheus, agrégées sur tous les workers"""
+    try:
+        snapshot = metrics_registry.snapshot()
+        if shared_store is not None:
+            shared_store.put(METRICS_KEY, snapshot)
+            snapshot = merge_snapshots([
+                entry["value"] for entry in shared_store.scan("metrics:", max_age=METRICS_STALE_AFTER)
+            ])
+        return Response(render_prometheus(snapshot),
+                        media_type="text/plain; version=0.0.4")
+    except Exception as e:
+        logger.error(f"Erreur lors de la génération des métriques: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erreur lors de la génération des métriques: {str(e)}"
+        )
+
 @app.post("/users/", status_code=status.HTTP_201_CREATED)
-def create_user(request: CreateUserRequest):
+async def create_user(request: CreateUserRequest, response: Response,
+                      idempotency_key: Optional[str] = Header(None)):
     """
     III.1: Endpoint pour créer un utilisateur
     Prend en compte la structure JSON cupws__AccountId__AccountAdditionalIds
+    Avec un en-tête Idempotency-Key, une répétition rejoue la première réponse
     """
+    return await run_idempotent(idempotency_key, "POST /users/", request,
+                                status.HTTP_201_CREATED, response, lambda: provision_user(request))
+
+async def provision_user(request: CreateUserRequest) -> Dict[str, Any]:
+    """Création synchrone d'un utilisateur dans Odoo (voir POST /users/)"""
     validate_odoo_connection()
     
     try:
-        # Extraction des données
-        login_name = request.user_account.login_name
-        display_name = request.user_account.other_ids.display_name or request.name or login_name
-        email = request.email or login_name
-        password = request.password or generate_password()
-        groups = request.groups or []
-        
         # Création de l'utilisateur dans Odoo
-        user_data = {
-            'name': display_name,
-            'login': login_name,
-            'email': email,
-            'password': password,
-            'active': True,
-            'groups_id': [(6, 0, groups)] if groups else []
-        }
-        
-        # Ajout des métadonnées si disponibles
-        if request.user_account.other_ids.up_id:
-            user_data['employee_id'] = request.user_account.other_ids.up_id
+        request.groups = await resolve_groups(request.groups or [])
+        user_data = build_user_values(request)
+        login_name = user_data['login']
+        display_name = user_data['name']
+        password = user_data['password']
+        groups = request.groups or []
         
-        user_id = models.execute_kw(
-            ODOO_DB, uid, ODOO_PASSWORD, 
+        user_id = await odoo.execute_kw(
             'res.users', 'create', 
             [user_data]
         )
@@ -188,6 +702,8 @@ def create_user(request: CreateUserRequest):
             "groups": groups
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erreur lors de la création de l'utilisateur: {e}")
         raise HTTPException(
@@ -195,17 +711,182 @@ def create_user(request: CreateUserRequest):
             detail=f"Erreur lors de la création de l'utilisateur: {str(e)}"
         )
 
+@app.post("/users/batch")
+async def create_users_batch(requests: List[CreateUserRequest]):
+    """
+    Création d'utilisateurs par lots (vagues d'onboarding RH)
+    Les utilisateurs sont envoyés par paquets de BATCH_CHUNK_SIZE en un seul
+    appel res.users.create; un enregistrement invalide n'empêche pas la
+    création des autres et chaque entrée reçoit son propre résultat.
+    Les entrées d'un paquet interrompu par une erreur réseau sont marquées
+    "outcome_unknown" et gardent leur mot de passe: le compte a pu être créé.
+    """
+    validate_odoo_connection()
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(requests)
+    items: List[Tuple[int, Dict[str, Any]]] = []
+    seen_logins = set()
+
+    for index, request in enumerate(requests):
+        try:
+            request.groups = await resolve_groups(request.groups or [])
+        except HTTPException as e:
+            results[index] = {"index": index, "login": request.user_account.login_name, "success": False,
+                              "error": f"Groupes non résolus: {e.detail['groups']}"}
+            continue
+        user_data = build_user_values(request)
+        login_name = user_data['login']
+        if login_name in seen_logins:
+            results[index] = {"index": index, "login": login_name, "success": False,
+                              "error": "Login en double dans le lot"}
+            continue
+        seen_logins.add(login_name)
+        items.append((index, user_data))
+
+    chunks = [items[i:i + BATCH_CHUNK_SIZE] for i in range(0, len(items), BATCH_CHUNK_SIZE)]
+    semaphore = asyncio.Semaphore(BATCH_MAX_PARALLEL_CHUNKS)
+
+    async def run_chunk(chunk):
+        async with semaphore:
+            return await create_users_chunk(chunk)
+
+    outcomes: Dict[int, Any] = {}
+    for chunk_outcome in await asyncio.gather(*(run_chunk(chunk) for chunk in chunks)):
+        outcomes.update(chunk_outcome)
+
+    for index, user_data in items:
+        request = requests[index]
+        outcome = outcomes[index]
+        if isinstance(outcome, CreationOutcomeUnknown):
+            logger.warning(f"Création de l'utilisateur {user_data['login']} incertaine: {outcome}")
+            results[index] = {"index": index, "login": user_data['login'], "success": False,
+                              "outcome_unknown": True, "error": str(outcome),
+                              "password": user_data['password'] if not request.password else "***"}
+        elif isinstance(outcome, Exception):
+            logger.error(f"Erreur lors de la création de l'utilisateur {user_data['login']}: {outcome}")
+            results[index] = {"index": index, "login": user_data['login'], "success": False,
+                              "error": str(outcome)}
+        else:
+            results[index] = {
+                "index": index,
+                "login": user_data['login'],
+                "success": True,
+                "user_id": outcome,
+                "password": user_data['password'] if not request.password else "***",
+                "groups": request.groups or []
+            }
+
+    created = sum(1 for result in results if result["success"])
+    unknown = sum(1 for result in results if result.get("outcome_unknown"))
+    logger.info(f"Création par lots: {created}/{len(requests)} utilisateurs créés "
+                f"en {len(chunks)} lot(s)")
+
+    return {
+        "message": "Création par lots terminée",
+        "total": len(requests),
+        "created": created,
+        "failed": len(requests) - created - unknown,
+        "unknown": unknown,
+        "results": results
+    }
+
+@app.get("/users/")
+@app.get("/users", include_in_schema=False)
+async def list_users(
+    after: int = Query(0, ge=0, description="Curseur: ID du dernier utilisateur déjà reçu"),
+    limit: Optional[int] = Query(None, ge=1, description="Nombre maximum d'utilisateurs"),
+    fields: Optional[str] = Query(None, description="Champs à renvoyer, séparés par des virgules"),
+    ids: Optional[str] = Query(None, description="IDs à lire en une fois, séparés par des virgules"),
+    expand: Optional[str] = Query(None, pattern="^groups$", description="groups: joindre le détail des groupes"),
+    include_inactive: bool = False,
+    format: str = Query("json", pattern="^(json|ndjson)$")
+):
+    """
+    Lister les utilisateurs, paginés par curseur sur l'ID (pas d'OFFSET).
+    En format=ndjson, tous les utilisateurs suivants sont envoyés au fil de
+    l'eau, une ligne JSON par utilisateur, par lectures de USERS_PAGE_MAX.
+    Avec ids=..., les utilisateurs demandés sont lus en un seul appel;
+    expand=groups joint leurs groupes sans un appel par utilisateur.
+    """
+    validate_odoo_connection()
+    
+    user_fields = parse_user_fields(fields)
+    if expand and 'groups_id' not in user_fields:
+        user_fields.append('groups_id')
+    
+    try:
+        if ids is not None:
+            user_ids = parse_id_list(ids)
+            found = await odoo.execute_kw(
+                'res.users', 'search_read',
+                [[('id', 'in', user_ids)]],
+                {'fields': user_fields, 'context': {'active_test': False}}
+            ) if user_ids else []
+            by_id = {user['id']: user for user in found}
+            users = [by_id[user_id] for user_id in user_ids if user_id in by_id]
+            if expand:
+                await expand_user_groups(users)
+            return {
+                "users": users,
+                "count": len(users),
+                "missing": [user_id for user_id in user_ids if user_id not in by_id]
+            }
+        
+        if format == "json":
+            page_size = min(limit or USERS_PAGE_SIZE, USERS_PAGE_MAX)
+            users = await read_users_page(after, user_fields, page_size, include_inactive)
+            if expand:
+                await expand_user_groups(users)
+            return {
+                "users": users,
+                "count": len(users),
+                "limit": page_size,
+                "next_cursor": users[-1]['id'] if len(users) == page_size else None
+            }
+        
+        # La première page est lue avant de répondre: une erreur Odoo donne encore un 500
+        page_size = min(limit or USERS_PAGE_MAX, USERS_PAGE_MAX)
+        first_page = await read_users_page(after, user_fields, page_size, include_inactive)
+        if expand:
+            await expand_user_groups(first_page)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erreur lors de la récupération des utilisateurs: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erreur lors de la récupération des utilisateurs: {str(e)}"
+        )
+    
+    async def stream_users():
+        page, sent = first_page, 0
+        while True:
+            for user in page:
+                yield json.dumps(user, ensure_ascii=False) + "\n"
+            sent += len(page)
+            remaining = limit - sent if limit else page_size
+            if len(page) < page_size or remaining <= 0:
+                break
+            try:
+                page = await read_users_page(page[-1]['id'], user_fields,
+                                             min(page_size, remaining), include_inactive)
+                if expand:
+                    await expand_user_groups(page)
+            except Exception as e:
+                logger.error(f"Export NDJSON interrompu après {sent} utilisateurs: {e}")
+                yield json.dumps({"error": str(e), "after": page[-1]['id']}) + "\n"
+                break
+    
+    return StreamingResponse(stream_users(), media_type="application/x-ndjson")
+
 @app.get("/users/{user_id}")
-def get_user(user_id: int):
+async def get_user(user_id: int):
     """Récupérer les informations d'un utilisateur"""
     validate_odoo_connection()
     
     try:
-        user = models.execute_kw(
-            ODOO_DB, uid, ODOO_PASSWORD,
-            'res.users', 'read',
-            [user_id], {'fields': ['name', 'login', 'email', 'active', 'groups_id']}
-        )
+        user = await user_cache.get(user_id, load_user)
         
         if not user:
             raise HTTPException(
@@ -213,7 +894,7 @@ def get_user(user_id: int):
                 detail="Utilisateur non trouvé"
             )
         
-        return user[0]
+        return user
         
     except HTTPException:
         raise
@@ -225,7 +906,7 @@ def get_user(user_id: int):
         )
 
 @app.put("/users/{user_id}")
-def update_user(user_id: int, request: UpdateUserRequest):
+async def update_user(user_id: int, request: UpdateUserRequest):
     """
     III.2: Endpoint pour modifier un utilisateur
     """
@@ -233,8 +914,7 @@ def update_user(user_id: int, request: UpdateUserRequest):
     
     try:
         # Vérifier que l'utilisateur existe
-        existing_user = models.execute_kw(
-            ODOO_DB, uid, ODOO_PASSWORD,
+        existing_user = await odoo.execute_kw(
             'res.users', 'search',
             [[('id', '=', user_id)]]
         )
@@ -256,7 +936,7 @@ def update_user(user_id: int, request: UpdateUserRequest):
         if request.password:
             values['password'] = request.password
         if request.groups is not None:
-            values['groups_id'] = [(6, 0, request.groups)]
+            values['groups_id'] = [(6, 0, await resolve_groups(request.groups))]
         
         if not values:
             raise HTTPException(
@@ -265,11 +945,13 @@ def update_user(user_id: int, request: UpdateUserRequest):
             )
         
         # Mise à jour
-        result = models.execute_kw(
-            ODOO_DB, uid, ODOO_PASSWORD,
-            'res.users', 'write',
-            [[user_id], values]
-        )
+        try:
+            result = await odoo.execute_kw(
+                'res.users', 'write',
+                [[user_id], values]
+            )
+        finally:
+            await invalidate_users([user_id])
         
         if result:
             logger.info(f"Utilisateur {user_id} mis à jour")
@@ -290,7 +972,7 @@ def update_user(user_id: int, request: UpdateUserRequest):
         )
 
 @app.delete("/users/{user_id}")
-def delete_user(user_id: int):
+async def delete_user(user_id: int):
     """
     III.3: Endpoint pour supprimer un utilisateur
     """
@@ -298,8 +980,7 @@ def delete_user(user_id: int):
     
     try:
         # Vérifier que l'utilisateur existe
-        existing_user = models.execute_kw(
-            ODOO_DB, uid, ODOO_PASSWORD,
+        existing_user = await odoo.execute_kw(
             'res.users', 'read',
             [user_id], {'fields': ['name', 'login']}
         )
@@ -311,11 +992,13 @@ def delete_user(user_id: int):
             )
         
         # Suppression
-        result = models.execute_kw(
-            ODOO_DB, uid, ODOO_PASSWORD,
-            'res.users', 'unlink',
-            [[user_id]]
-        )
+        try:
+            result = await odoo.execute_kw(
+                'res.users', 'unlink',
+                [[user_id]]
+            )
+        finally:
+            await invalidate_users([user_id])
         
         if result:
             logger.info(f"Utilisateur {user_id} supprimé: {existing_user[0]['name']}")
@@ -335,28 +1018,134 @@ def delete_user(user_id: int):
             detail=f"Erreur lors de la suppression: {str(e)}"
         )
 
-@app.post("/users/full", status_code=status.HTTP_201_CREATED)
-def create_user_with_roles(request: CreateUserRequest):
+async def run_create_user_job(payload: Dict[str, Any], job: JobContext) -> Dict[str, Any]:
+    """Traitement d'une tâche 'create_user' (voir POST /users/full)"""
+    user_data = payload["values"]
+    login_name = user_data['login']
+    groups = payload["groups"]
+    if not all(isinstance(ref, int) for ref in groups):
+        groups = await group_index.resolve(groups)
+        user_data['groups_id'] = [(6, 0, groups)] if groups else []
+
+    if job.attempt > 1:
+        # Une tentative précédente a pu créer le compte avant de perdre la connexion
+        await job.progress("Vérification d'une création antérieure", 0, 1)
+        existing = await odoo.execute_kw(
+            'res.users', 'search',
+            [[('login', '=', login_name)]], {'context': {'active_test': False}}
+        )
+        user_id = existing[0] if existing else None
+    else:
+        user_id = None
+
+    if user_id is None:
+        await job.progress("Création de l'utilisateur dans Odoo", 0, 1)
+        user_id = await odoo.execute_kw('res.users', 'create', [user_data])
+        logger.info(f"Utilisateur créé: {user_data['name']} (ID: {user_id})")
+    await job.progress("Terminé", 1, 1)
+
+    return {
+        "user_id": user_id,
+        "message": "Utilisateur créé avec succès",
+        "login": login_name,
+        "password": user_data['password'] if payload["password_generated"] else "***",
+        "groups": groups
+    }
+
+job_workers = JobWorkerPool(
+    job_store, {"create_user": run_create_user_job},
+    concurrency=JOBS_WORKERS, max_attempts=JOBS_MAX_ATTEMPTS,
+    retryable=(*odoo.connection_errors, HTTPException),  # HTTPException: 503 du disjoncteur
+    ready=lambda: odoo_session.connected
+)
+
+def job_status(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Représentation publique d'une tâche"""
+    return {
+        "job_id": job["id"],
+        "type": job["kind"],
+        "status": job["status"],
+        "progress": job["progress"],
+        "attempts": job["attempts"],
+        "result": job["result"],
+        "error": job["error"],
+        "created_at": datetime.fromtimestamp(job["created_at"]).isoformat(),
+        "finished_at": datetime.fromtimestamp(job["finished_at"]).isoformat() if job["finished_at"] else None
+    }
+
+@app.post("/users/full", status_code=status.HTTP_202_ACCEPTED)
+async def create_user_with_roles(request: CreateUserRequest, response: Response,
+                                 idempotency_key: Optional[str] = Header(None)):
     """
     III.4: Endpoint pour créer un utilisateur avec groupes en une seule opération
+    La création est confiée à une tâche de fond: la réponse (202) contient
+    l'identifiant de la tâche à suivre via GET /jobs/{job_id}.
+    Le compte est créé même si Odoo est momentanément indisponible.
+    Avec un en-tête Idempotency-Key, une répétition renvoie la même tâche.
+    """
+    return await run_idempotent(idempotency_key, "POST /users/full", request,
+                                status.HTTP_202_ACCEPTED, response,
+                                lambda: enqueue_user_creation(request, response))
+
+async def enqueue_user_creation(request: CreateUserRequest, response: Response) -> Dict[str, Any]:
+    """Planifie la création d'un utilisateur (voir POST /users/full)"""
+    try:
+        try:
+            request.groups = await resolve_groups(request.groups or [])
+        except (HTTPException, *odoo.connection_errors) as e:
+            if getattr(e, 'status_code', None) == status.HTTP_422_UNPROCESSABLE_ENTITY:
+                raise
+            # Odoo indisponible: les noms de groupes seront résolus par la tâche
+        user_data = build_user_values(request)
+        job_id = await asyncio.to_thread(job_store.enqueue, "create_user", {
+            "values": user_data,
+            "password_generated": not request.password,
+            "groups": request.groups or []
+        })
+        job_workers.notify()
+        logger.info(f"Création de l'utilisateur {user_data['login']} planifiée (tâche {job_id})")
+
+        response.headers["Location"] = f"/jobs/{job_id}"
+        return {
+            "job_id": job_id,
+            "status": "queued",
+            "message": "Création de l'utilisateur planifiée",
+            "status_url": f"/jobs/{job_id}"
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erreur lors de la planification de la création: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erreur lors de la planification de la création: {str(e)}"
+        )
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
     """
-    # Cette fonction est identique à create_user mais plus explicite
-    return create_user(request)
+    Suivi d'une tâche de provisionnement: avancement puis résultat final.
+    Le mot de passe généré n'est renvoyé qu'à la première lecture du résultat.
+    """
+    job = await asyncio.to_thread(job_store.get_once, job_id, ["password"])
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Tâche {job_id} non trouvée"
+        )
+    return job_status(job)
 
 @app.get("/users/{user_id}/roles")
-def get_user_roles(user_id: int):
+async def get_user_roles(user_id: int):
     """
     III.5: Endpoint pour lister les rôles/permissions d'un utilisateur
     """
     validate_odoo_connection()
     
     try:
-        # Récupérer les groupes de l'utilisateur
-        user = models.execute_kw(
-            ODOO_DB, uid, ODOO_PASSWORD,
-            'res.users', 'read',
-            [user_id], {'fields': ['groups_id']}
-        )
+        # Récupérer les groupes de l'utilisateur (fiche en cache)
+        user = await user_cache.get(user_id, load_user)
         
         if not user:
             raise HTTPException(
@@ -364,17 +1153,15 @@ def get_user_roles(user_id: int):
                 detail="Utilisateur non trouvé"
             )
         
-        group_ids = user[0]['groups_id']
+        group_ids = user['groups_id']
         
         if not group_ids:
             return {"user_id": user_id, "groups": [], "message": "Aucun groupe assigné"}
         
-        # Récupérer les détails des groupes
-        groups = models.execute_kw(
-            ODOO_DB, uid, ODOO_PASSWORD,
-            'res.groups', 'read',
-            [group_ids], {'fields': ['name', 'category_id']}
-        )
+        # Détails des groupes depuis le catalogue en cache
+        await expand_user_groups([user])
+        groups = [{'id': group['id'], 'name': group['name'], 'category_id': group['category_id']}
+                  for group in user['groups']]
         
         return {
             "user_id": user_id,
@@ -392,49 +1179,27 @@ def get_user_roles(user_id: int):
         )
 
 @app.post("/users/{user_id}/roles")
-def assign_roles(user_id: int, request: AssignRolesRequest):
+async def assign_roles(user_id: int, request: AssignRolesRequest):
     """
     III.6: Endpoint pour attribuer des rôles à un utilisateur
+    Les groupes sont ajoutés par commandes (4, id) en un seul write, pour
+    l'utilisateur et les éventuels user_ids supplémentaires.
     """
     validate_odoo_connection()
     
+    user_ids = list(dict.fromkeys([user_id] + request.user_ids))
+    
     try:
-        # Vérifier que l'utilisateur existe
-        user = models.execute_kw(
-            ODOO_DB, uid, ODOO_PASSWORD,
-            'res.users', 'read',
-            [[user_id]], {'fields': ['groups_id']}
-        )
+        request.groups = await resolve_groups(request.groups)
+        await apply_group_commands(user_ids, [(4, group_id) for group_id in request.groups])
         
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Utilisateur non trouvé"
-            )
-        
-        existing_groups = user[0]['groups_id']
-        new_groups = list(set(existing_groups + request.groups))
-        
-        # Mise à jour des groupes
-        result = models.execute_kw(
-            ODOO_DB, uid, ODOO_PASSWORD,
-            'res.users', 'write',
-            [[user_id], {'groups_id': [(6, 0, new_groups)]}]
-        )
-        
-        if result:
-            logger.info(f"Rôles attribués à l'utilisateur {user_id}: {request.groups}")
-            return {
-                "message": "Rôles attribués avec succès",
-                "user_id": user_id,
-                "groups": new_groups,
-                "added_groups": request.groups
-            }
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Échec de l'attribution des rôles"
-            )
+        logger.info(f"Rôles attribués aux utilisateurs {user_ids}: {request.groups}")
+        return {
+            "message": "Rôles attribués avec succès",
+            "user_id": user_id,
+            "user_ids": user_ids,
+            "added_groups": request.groups
+        }
             
     except HTTPException:
         raise
@@ -446,76 +1211,118 @@ def assign_roles(user_id: int, request: AssignRolesRequest):
         )
 
 @app.delete("/users/{user_id}/roles")
-def remove_roles(user_id: int, request: AssignRolesRequest):
+async def remove_roles(user_id: int, request: AssignRolesRequest):
     """
     III.7: Endpoint pour retirer des rôles d'un utilisateur
+    Les groupes sont retirés par commandes (3, id) en un seul write, pour
+    l'utilisateur et les éventuels user_ids supplémentaires.
     """
     validate_odoo_connection()
     
+    user_ids = list(dict.fromkeys([user_id] + request.user_ids))
+    
     try:
-        # Vérifier que l'utilisateur existe
-        user = models.execute_kw(
-            ODOO_DB, uid, ODOO_PASSWORD,
-            'res.users', 'read',
-            [[user_id]], {'fields': ['groups_id']}
-        )
+        request.groups = await resolve_groups(request.groups)
+        await apply_group_commands(user_ids, [(3, group_id) for group_id in request.groups])
         
-        if not user:
+        logger.info(f"Rôles retirés des utilisateurs {user_ids}: {request.groups}")
+        return {
+            "message": "Rôles retirés avec succès",
+            "user_id": user_id,
+            "user_ids": user_ids,
+            "removed_groups": request.groups
+        }
+            
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erreur lors du retrait des rôles de l'utilisateur {user_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erreur lors du retrait des rôles: {str(e)}"
+        )
+
+@app.post("/roles/assign")
+async def assign_roles_bulk(request: BulkRolesRequest):
+    """
+    Attribution et retrait de rôles en masse (un groupe pour tout un service...).
+    Les utilisateurs (IDs ou logins) sont résolus en deux recherches au plus,
+    puis modifiés par writes de ROLES_CHUNK_SIZE utilisateurs portant à la fois
+    les ajouts (4, id) et les retraits (3, id). Les utilisateurs inconnus sont
+    ignorés et signalés dans la réponse.
+    """
+    validate_odoo_connection()
+    
+    if not request.add and not request.remove:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Aucun groupe à ajouter ou à retirer"
+        )
+    if len(request.users) > ROLES_BULK_MAX_USERS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Au plus {ROLES_BULK_MAX_USERS} utilisateurs par requête"
+        )
+    
+    try:
+        added = await resolve_groups(request.add)
+        removed = await resolve_groups(request.remove)
+        conflicting = set(added) & set(removed)
+        if conflicting:
             raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Utilisateur non trouvé"
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Groupe(s) à la fois ajouté(s) et retiré(s): {sorted(conflicting)}"
             )
         
-        existing_groups = user[0]['groups_id']
-        updated_groups = [group for group in existing_groups if group not in request.groups]
+        user_ids, not_found = await resolve_users(request.users)
+        commands = [(4, group_id) for group_id in added] + [(3, group_id) for group_id in removed]
+        writes = await apply_group_commands(user_ids, commands) if user_ids else 0
         
-        # Mise à jour des groupes
-        result = models.execute_kw(
-            ODOO_DB, uid, ODOO_PASSWORD,
-            'res.users', 'write',
-            [[user_id], {'groups_id': [(6, 0, updated_groups)]}]
-        )
-        
-        if result:
-            logger.info(f"Rôles retirés de l'utilisateur {user_id}: {request.groups}")
-            return {
-                "message": "Rôles retirés avec succès",
-                "user_id": user_id,
-                "groups": updated_groups,
-                "removed_groups": request.groups
-            }
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Échec du retrait des rôles"
-            )
+        logger.info(f"Rôles modifiés pour {len(user_ids)} utilisateur(s) en {writes} écriture(s): "
+                    f"ajout {added}, retrait {removed}")
+        return {
+            "message": "Rôles modifiés avec succès",
+            "updated": len(user_ids),
+            "not_found": not_found,
+            "added_groups": added,
+            "removed_groups": removed,
+            "writes": writes
+        }
             
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Erreur lors du retrait des rôles de l'utilisateur {user_id}: {e}")
+        logger.error(f"Erreur lors de la modification des rôles en masse: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Erreur lors du retrait des rôles: {str(e)}"
+            detail=f"Erreur lors de la modification des rôles: {str(e)}"
         )
 
 @app.get("/groups/")
-def list_groups():
-    """Endpoint pour lister tous les groupes disponibles"""
+async def list_groups(request: Request, response: Response):
+    """
+    Endpoint pour lister tous les groupes disponibles
+    Servi depuis le catalogue en cache; gère l'en-tête If-None-Match (ETag)
+    """
     validate_odoo_connection()
     
     try:
-        groups = models.execute_kw(
-            ODOO_DB, uid, ODOO_PASSWORD,
-            'res.groups', 'search_read',
-            [[]], {'fields': ['name', 'category_id', 'comment']}
-        )
+        groups = await group_catalogue.get()
+        etag = group_catalogue.etag
         
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED,
+                            headers={"ETag": etag, "Cache-Control": "no-cache"})
+        
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache"
         return {
             "groups": groups,
             "total": len(groups)
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erreur lors de la récupération des groupes: {e}")
         raise HTTPException(
@@ -523,18 +1330,38 @@ def list_groups():
             detail=f"Erreur lors de la récupération des groupes: {str(e)}"
         )
 
-@app.get("/groups/search/{group_name}")
-def search_group_by_name(group_name: str):
-    """Rechercher un groupe par nom"""
+@app.post("/groups/refresh")
+async def refresh_groups():
+    """Invalide le catalogue des groupes en cache et le recharge depuis Odoo"""
     validate_odoo_connection()
     
     try:
-        groups = models.execute_kw(
-            ODOO_DB, uid, ODOO_PASSWORD,
-            'res.groups', 'search_read',
-            [[('name', 'ilike', group_name)]], 
-            {'fields': ['name', 'category_id', 'comment']}
+        group_catalogue.invalidate()
+        group_external_ids.invalidate()
+        groups = await group_catalogue.get()
+        
+        return {
+            "message": "Catalogue des groupes rechargé",
+            "total": len(groups),
+            "etag": group_catalogue.etag
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erreur lors du rechargement des groupes: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erreur lors du rechargement des groupes: {str(e)}"
         )
+
+@app.get("/groups/search/{group_name}")
+async def search_group_by_name(group_name: str):
+    """Rechercher un groupe par nom (dans le catalogue en cache)"""
+    validate_odoo_connection()
+    
+    try:
+        groups = await group_catalogue.search(group_name)
         
         return {
             "groups": groups,
@@ -542,6 +1369,8 @@ def search_group_by_name(group_name: str):
             "search_term": group_name
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erreur lors de la recherche du groupe '{group_name}': {e}")
         raise HTTPException(
@@ -549,7 +1378,25 @@ def search_group_by_name(group_name: str):
             detail=f"Erreur lors de la recherche du groupe: {str(e)}"
         )
 
-
 if __name__ == "__main__":
+    import argparse
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
+    
+    parser = argparse.ArgumentParser(description="API de Provisionnement Odoo")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--production", action="store_true",
+                        help="Plusieurs workers (un par cœur par défaut), sans rechargement automatique")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Nombre de workers en mode production")
+    args = parser.parse_args()
+    
+    if args.production:
+        # Chaque worker est un processus avec son propre client RPC vers Odoo;
+        # le catalogue des groupes est partagé via SHARED_CACHE_PATH
+        workers = args.workers or os.cpu_count() or 1
+        logger.info(f"Démarrage en production: {workers} worker(s) sur le port {args.port}")
+        uvicorn.run("odoo_api:app", host=args.host, port=args.port, workers=workers,
+                    proxy_headers=True, access_log=False)
+    else:
+        uvicorn.run("odoo_api:app", host=args.host, port=args.port, reload=True)
@@ -0,0 +1,498 @@
+#!/usr/bin/env python3
+"""
+Système de provisionnement IAM pour Odoo
+Caches de l'API de provisionnement (mémoire du worker et stockage partagé)
+
+Auteur: Système IAM Odoo
+Date: 2025-05-28
+"""
+
+import asyncio
+import bisect
+import copy
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any, Callable, Awaitable, Iterable, Tuple
+
+from odoo_rpc import coalescing_scope
+
+logger = logging.getLogger(__name__)
+
+
+def compute_etag(data: Any) -> str:
+    """Calcule un ETag stable à partir d'un contenu sérialisable en JSON"""
+    payload = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+    return '"' + hashlib.sha1(payload.encode('utf-8')).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    """Indique si l'en-tête If-None-Match désigne l'ETag courant"""
+    if not if_none_match or not etag:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(',')]
+    return '*' in candidates or any(value.removeprefix('W/') == etag for value in candidates)
+
+
+class SharedStore:
+    """
+    Stockage SQLite partagé par les workers d'une même machine.
+
+    Chaque entrée porte un numéro de version incrémenté à chaque écriture ou
+    invalidation; les baux ("leases") garantissent qu'un seul worker à la
+    fois recharge une donnée depuis Odoo.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.owner = f"{os.getpid()}-{id(self)}"
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, etag TEXT,"
+                " version INTEGER NOT NULL, updated_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS leases ("
+                " key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        """Une connexion par thread (les connexions sqlite3 ne se partagent pas)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def version(self, key: str) -> Optional[int]:
+        row = self._connection().execute(
+            "SELECT version FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(
+            "SELECT value, etag, version, updated_at FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"value": json.loads(row[0]), "etag": row[1],
+                "version": row[2], "updated_at": row[3]}
+
+    def scan(self, prefix: str, max_age: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Entrées dont la clé commence par `prefix` (mises à jour depuis moins de `max_age`s)"""
+        min_updated = time.time() - max_age if max_age is not None else 0
+        rows = self._connection().execute(
+            "SELECT key, value, updated_at FROM entries"
+            " WHERE substr(key, 1, ?) = ? AND updated_at >= ?",
+            (len(prefix), prefix, min_updated)
+        ).fetchall()
+        return [{"key": row[0], "value": json.loads(row[1]), "updated_at": row[2]} for row in rows]
+
+    def delete(self, key: str):
+        self._connection().execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def put(self, key: str, value: Any, etag: Optional[str] = None) -> int:
+        """Enregistre une valeur et retourne sa nouvelle version"""
+        conn = self._connection()
+        conn.execute(
+            "INSERT INTO entries (key, value, etag, version, updated_at) VALUES (?, ?, ?, 1, ?)"
+            " ON CONFLICT(key) DO UPDATE SET value = excluded.value, etag = excluded.etag,"
+            " version = entries.version + 1, updated_at = excluded.updated_at",
+            (key, json.dumps(value, ensure_ascii=False), etag, time.time())
+        )
+        return self.version(key)
+
+    def touch(self, keys: List[str]):
+        """Incrémente la version de plusieurs entrées en une transaction (invalidation groupée)"""
+        conn = self._connection()
+        now = time.time()
+        with conn:
+            conn.execute("BEGIN")
+            conn.executemany(
+                "INSERT INTO entries (key, value, etag, version, updated_at) VALUES (?, 'null', NULL, 1, ?)"
+                " ON CONFLICT(key) DO UPDATE SET version = entries.version + 1, updated_at = excluded.updated_at",
+                [(key, now) for key in keys]
+            )
+
+    def expire(self, key: str):
+        """Marque une entrée comme périmée pour tous les workers"""
+        self._connection().execute(
+            "UPDATE entries SET updated_at = 0, version = version + 1 WHERE key = ?", (key,)
+        )
+
+    def acquire_lease(self, key: str, duration: float) -> bool:
+        """Tente de prendre le bail de rechargement d'une entrée"""
+        conn = self._connection()
+        now = time.time()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT owner, expires_at FROM leases WHERE key = ?", (key,)).fetchone()
+            if row is not None and row[0] != self.owner and row[1] > now:
+                conn.execute("COMMIT")
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO leases (key, owner, expires_at) VALUES (?, ?, ?)",
+                (key, self.owner, now + duration)
+            )
+            conn.execute("COMMIT")
+            return True
+        except sqlite3.OperationalError:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            return False
+
+    def release_lease(self, key: str):
+        self._connection().execute(
+            "DELETE FROM leases WHERE key = ? AND owner = ?", (key, self.owner)
+        )
+
+
+class CachedDataset:
+    """
+    Jeu de données Odoo conservé en mémoire, éventuellement partagé entre workers.
+
+    Le contenu est rechargé au plus une fois par période `ttl`, ou après une
+    invalidation explicite. Les requêtes concurrentes qui trouvent le cache
+    expiré attendent un seul rechargement. Avec un SharedStore, un worker à
+    froid reprend la copie déjà chargée par un autre worker, et un seul
+    worker à la fois interroge Odoo.
+    """
+
+    key = "dataset"
+    lease_duration = 30.0  # Durée maximum d'un rechargement depuis Odoo
+    sync_interval = 1.0  # Fréquence de vérification des changements du stockage partagé
+
+    def __init__(self, loader: Callable[[], Awaitable[Any]], ttl: float = 300.0,
+                 store: Optional[SharedStore] = None):
+        self.loader = loader
+        self.ttl = ttl
+        self.store = store
+        self.data: Any = None
+        self.etag: Optional[str] = None
+        self.loaded_at = 0.0
+        self.version: Optional[int] = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def is_fresh(self) -> bool:
+        return self.data is not None and time.time() - self.loaded_at < self.ttl
+
+    def _store_changed(self) -> bool:
+        """Indique si un autre worker a modifié ou invalidé l'entrée partagée"""
+        if self.store is None or time.monotonic() - self._checked_at < self.sync_interval:
+            return False
+        self._checked_at = time.monotonic()
+        return self.store.version(self.key) != self.version
+
+    async def get(self) -> Any:
+        """Retourne le contenu, en le rechargeant si nécessaire"""
+        if self.is_fresh() and not self._store_changed():
+            return self.data
+        async with self._lock:
+            if not self.is_fresh() or self.store is not None and self.store.version(self.key) != self.version:
+                await self._refresh()
+        return self.data
+
+    async def _refresh(self):
+        if self.store is None:
+            self.set(await self.loader())
+            return
+
+        if self._adopt_shared():
+            return
+        if self.store.acquire_lease(self.key, self.lease_duration):
+            try:
+                self.set(await self.loader())
+            finally:
+                self.store.release_lease(self.key)
+            return
+
+        # Un autre worker recharge déjà: on attend sa copie plutôt que d'interroger Odoo
+        deadline = time.monotonic() + self.lease_duration
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            if self._adopt_shared():
+                return
+        self.set(await self.loader())
+
+    def _adopt_shared(self) -> bool:
+        """Reprend la copie du stockage partagé si elle est encore valide"""
+        entry = self.store.get(self.key)
+        if entry is None or time.time() - entry["updated_at"] >= self.ttl:
+            return False
+        self.data = entry["value"]
+        self.etag = entry["etag"]
+        self.loaded_at = entry["updated_at"]
+        self.version = entry["version"]
+        return True
+
+    def set(self, data: Any):
+        """Remplace le contenu (et le publie dans le stockage partagé)"""
+        self.data = data
+        self.etag = compute_etag(data)
+        self.loaded_at = time.time()
+        if self.store is not None:
+            self.version = self.store.put(self.key, data, self.etag)
+        logger.info(f"Cache '{self.key}' chargé depuis Odoo ({len(data)} éléments)")
+
+    def invalidate(self):
+        """Force le rechargement au prochain accès, dans tous les workers"""
+        self.loaded_at = 0.0
+        if self.store is not None:
+            self.store.expire(self.key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self.data) if self.data is not None else None,
+            "fresh": self.is_fresh(),
+            "age_seconds": round(time.time() - self.loaded_at, 1) if self.data is not None else None,
+            "etag": self.etag,
+            "shared": self.store is not None,
+        }
+
+
+class GroupCatalogue(CachedDataset):
+    """Catalogue des groupes Odoo (res.groups)"""
+
+    key = "groups"
+
+    async def search(self, name: str) -> List[Dict[str, Any]]:
+        """Recherche par nom, insensible à la casse (équivalent de 'ilike')"""
+        term = name.lower()
+        return [group for group in await self.get() if term in (group.get('name') or '').lower()]
+
+
+class GroupExternalIds(CachedDataset):
+    """Identifiants externes des groupes (ir.model.data: module, name, res_id)"""
+
+    key = "group_external_ids"
+
+
+class UnresolvedGroupsError(ValueError):
+    """Références de groupes introuvables ou ambiguës (référence → motif)"""
+
+    def __init__(self, errors: Dict[str, str]):
+        super().__init__(", ".join(f"{ref}: {reason}" for ref, reason in errors.items()))
+        self.errors = errors
+
+
+class GroupIndex:
+    """
+    Résolution des références de groupes (ID, nom ou identifiant externe)
+    sans appel à Odoo.
+
+    L'index est reconstruit à partir du catalogue des groupes et des
+    identifiants externes lorsque l'un des deux change. Une référence
+    textuelle est cherchée dans l'ordre: identifiant externe
+    ("base.group_user"), nom ou nom complet ("Sales / User") exact, puis
+    sans tenir compte de la casse, puis début de nom s'il désigne un seul
+    groupe.
+    """
+
+    def __init__(self, catalogue: GroupCatalogue, external_ids: GroupExternalIds):
+        self.catalogue = catalogue
+        self.external_ids = external_ids
+        self.resolved = 0
+        self.unresolved = 0
+        self._source: Optional[Tuple[Optional[str], Optional[str]]] = None
+        self._by_external_id: Dict[str, int] = {}
+        self._by_name: Dict[str, set] = {}
+        self._by_folded_name: Dict[str, set] = {}
+        self._folded_names: List[str] = []
+
+    async def _refresh(self):
+        groups = await self.catalogue.get()
+        external_ids = await self.external_ids.get()
+        source = (self.catalogue.etag, self.external_ids.etag)
+        if source == self._source:
+            return
+
+        by_name: Dict[str, set] = {}
+        for group in groups:
+            names = [group.get('name') or '']
+            if group.get('category_id'):
+                names.append(f"{group['category_id'][1]} / {names[0]}")
+            for name in names:
+                by_name.setdefault(name, set()).add(group['id'])
+        by_folded_name: Dict[str, set] = {}
+        for name, ids in by_name.items():
+            by_folded_name.setdefault(name.casefold(), set()).update(ids)
+
+        self._by_external_id = {f"{entry['module']}.{entry['name']}".casefold(): entry['res_id']
+                                for entry in external_ids}
+        self._by_name = by_name
+        self._by_folded_name = by_folded_name
+        self._folded_names = sorted(by_folded_name)
+        self._source = source
+
+    def _lookup(self, ref: str) -> Tuple[Optional[int], Optional[str]]:
+        """Retourne (ID, None) ou (None, motif de l'échec)"""
+        folded = ref.strip().casefold()
+        if folded in self._by_external_id:
+            return self._by_external_id[folded], None
+        for ids in (self._by_name.get(ref.strip()), self._by_folded_name.get(folded)):
+            if ids and len(ids) == 1:
+                return next(iter(ids)), None
+            if ids:
+                return None, f"nom ambigu ({len(ids)} groupes), préciser la catégorie ou l'ID"
+
+        # Début de nom: les noms triés qui commencent par la référence sont contigus
+        matches: set = set()
+        for name in self._folded_names[bisect.bisect_left(self._folded_names, folded):]:
+            if not name.startswith(folded):
+                break
+            matches.update(self._by_folded_name[name])
+        if len(matches) == 1:
+            return next(iter(matches)), None
+        if matches:
+            return None, f"début de nom ambigu ({len(matches)} groupes)"
+        return None, "groupe introuvable"
+
+    async def resolve(self, refs: Iterable[Any]) -> List[int]:
+        """
+        Convertit des références de groupes en IDs (les entiers sont conservés
+        tels quels); lève UnresolvedGroupsError si l'une d'elles ne correspond
+        à aucun groupe ou à plusieurs
+        """
+        refs = list(refs)
+        if all(isinstance(ref, int) for ref in refs):
+            return refs
+        await self._refresh()
+
+        group_ids: List[int] = []
+        errors: Dict[str, str] = {}
+        for ref in refs:
+            if isinstance(ref, int):
+                group_ids.append(ref)
+            elif ref.strip().isdigit():
+                group_ids.append(int(ref))
+            else:
+                group_id, error = self._lookup(ref)
+                if error is None:
+                    group_ids.append(group_id)
+                else:
+                    errors[ref] = error
+        if errors:
+            self.unresolved += len(errors)
+            raise UnresolvedGroupsError(errors)
+        self.resolved += len(refs)
+        return list(dict.fromkeys(group_ids))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "names": len(self._by_name),
+            "external_ids": len(self._by_external_id),
+            "resolved": self.resolved,
+            "unresolved": self.unresolved,
+        }
+
+
+class UserCache:
+    """
+    Cache LRU des fiches utilisateurs (res.users), borné en taille et en durée.
+
+    Les écritures faites par l'API invalident immédiatement les entrées
+    concernées. Avec un SharedStore, chaque invalidation incrémente un numéro
+    de version par utilisateur, vérifié à chaque lecture: une entrée modifiée
+    par un autre worker n'est jamais resservie. Une lecture commencée avant
+    une invalidation n'est pas mise en cache, et une lecture commencée après
+    ne rejoint pas un appel Odoo lancé avant (portée de fusion par version).
+    Un numéro de version local n'est conservé que tant que l'utilisateur est
+    en cache ou en cours de chargement. Les accès au SharedStore (SQLite)
+    passent par un thread pour ne pas bloquer la boucle d'événements.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 60.0, store: Optional[SharedStore] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries: "OrderedDict[int, Tuple[float, Tuple[int, Optional[int]], Dict[str, Any]]]" = OrderedDict()
+        self._local_versions: Dict[int, int] = {}
+        self._loading: Dict[int, int] = {}  # Chargements en cours par utilisateur
+
+    async def _version(self, user_id: int) -> Tuple[int, Optional[int]]:
+        shared = None
+        if self.store is not None:
+            shared = await asyncio.to_thread(self.store.version, f"user:{user_id}")
+        # Version locale lue après le SharedStore: une invalidation pendant la lecture compte aussi
+        return self._local_versions.get(user_id, 0), shared
+
+    async def get(self, user_id: int,
+                  loader: Callable[[int], Awaitable[Optional[Dict[str, Any]]]]) -> Optional[Dict[str, Any]]:
+        """Retourne la fiche en cache, ou la charge via `loader` (None si l'utilisateur n'existe pas)"""
+        version = await self._version(user_id)
+        entry = self._entries.get(user_id)
+        if entry is not None and time.monotonic() < entry[0] and entry[1] == version:
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return copy.deepcopy(entry[2])
+
+        self.misses += 1
+        self._loading[user_id] = self._loading.get(user_id, 0) + 1
+        scope = coalescing_scope.set(("user", user_id, version))
+        try:
+            record = await loader(user_id)
+            # Vérifiée pendant le chargement: sa version locale reste conservée
+            current = await self._version(user_id) if record is not None else None
+        finally:
+            coalescing_scope.reset(scope)
+            self._loading[user_id] -= 1
+            if not self._loading[user_id]:
+                del self._loading[user_id]
+        if record is not None and current == version:
+            self._entries[user_id] = (time.monotonic() + self.ttl, version, copy.deepcopy(record))
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._forget_version(self._entries.popitem(last=False)[0])
+        else:
+            self._forget_version(user_id)
+        return record
+
+    def records(self) -> Dict[int, Dict[str, Any]]:
+        """Fiches actuellement en cache (sans copie: à ne pas modifier)"""
+        return {user_id: entry[2] for user_id, entry in self._entries.items()}
+
+    def tracked_ids(self) -> List[int]:
+        """Utilisateurs en cache ou en cours de chargement"""
+        return list(dict.fromkeys([*self._entries, *self._loading]))
+
+    def _forget_version(self, user_id: int):
+        # Sans entrée ni chargement en cours, aucune lecture ne compare plus cette version
+        if user_id not in self._entries and user_id not in self._loading:
+            self._local_versions.pop(user_id, None)
+
+    async def invalidate(self, user_ids: Iterable[int]):
+        """Retire des utilisateurs du cache, dans tous les workers"""
+        user_ids = list(user_ids)
+        for user_id in user_ids:
+            self._entries.pop(user_id, None)
+            self._local_versions[user_id] = self._local_versions.get(user_id, 0) + 1
+            self._forget_version(user_id)
+        self.invalidations += len(user_ids)
+        if self.store is not None and user_ids:
+            await asyncio.to_thread(self.store.touch, [f"user:{user_id}" for user_id in user_ids])
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+            "invalidations": self.invalidations,
+        }
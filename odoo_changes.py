@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Système de provisionnement IAM pour Odoo
+Suivi incrémental des modifications Odoo (write_date) pour les caches de l'API
+
+Auteur: Système IAM Odoo
+Date: 2025-05-28
+"""
+
+import asyncio
+import inspect
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Any, Callable, Iterable
+
+logger = logging.getLogger(__name__)
+
+ODOO_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+EPOCH = "1970-01-01 00:00:00"  # Filigrane d'un modèle vide
+
+
+class ChangeFeed:
+    """
+    Instantané local d'un modèle Odoo, tenu à jour par write_date.
+
+    Chaque interrogation ne lit que les enregistrements modifiés depuis le
+    filigrane (la plus grande write_date vue), moins une marge `overlap`:
+    write_date est l'heure de début de la transaction Odoo, à la seconde
+    près, et une transaction longue peut être validée après l'interrogation
+    suivante. Les enregistrements relus sans changement sont ignorés grâce
+    à l'instantané. Les suppressions, invisibles dans write_date, sont
+    détectées par une comparaison des IDs toutes les `reconcile_interval`
+    secondes.
+
+    Avec `mirror=False`, le modèle n'est pas recopié: l'interrogation
+    initiale ne lit que la dernière write_date, l'instantané ne garde que les
+    enregistrements vus dans la marge `overlap`, et seuls les IDs retournés
+    par `tracked()` (les fiches en cache) sont vérifiés pour les suppressions.
+
+    `on_change(changed_ids, removed_ids, initial)` (fonction ou coroutine)
+    est appelé après chaque interrogation qui a détecté des changements; s'il
+    échoue, les enregistrements modifiés sont relus à l'interrogation suivante.
+    """
+
+    def __init__(self, client, model: str, fields: List[str], batch_size: int = 500,
+                 overlap: float = 10.0, reconcile_interval: float = 300.0,
+                 on_change: Optional[Callable[[List[int], List[int], bool], None]] = None,
+                 mirror: bool = True, tracked: Optional[Callable[[], Iterable[int]]] = None):
+        self.client = client
+        self.model = model
+        self.fields = list(dict.fromkeys(fields + ['write_date']))
+        self.mirror = mirror
+        self.tracked = tracked
+        self.batch_size = batch_size
+        self.overlap = overlap
+        self.reconcile_interval = reconcile_interval
+        self.on_change = on_change
+
+        self.snapshot: Dict[int, Dict[str, Any]] = {}
+        self.watermark: Optional[str] = None
+        self.synced_at: Optional[float] = None
+        self.polls = 0
+        self.queries = 0
+        self.changes = 0
+        self.last_error: Optional[str] = None
+        self._reconciled_at = 0.0
+        self._forgotten: Optional[set] = None  # IDs écartés pendant l'interrogation en cours
+
+    def is_synced(self, max_lag: float) -> bool:
+        """Indique si l'instantané a été mis à jour depuis moins de `max_lag` secondes"""
+        return self.synced_at is not None and time.monotonic() - self.synced_at < max_lag
+
+    def forget(self, record_ids: Iterable[int]):
+        """
+        Retire des enregistrements de l'instantané (écriture faite par l'API):
+        ils y reviennent à la prochaine interrogation
+        """
+        for record_id in record_ids:
+            self.snapshot.pop(record_id, None)
+            if self._forgotten is not None:
+                self._forgotten.add(record_id)
+
+    async def _search_read(self, domain: List[Any]) -> List[Dict[str, Any]]:
+        self.queries += 1
+        return await self.client.execute_kw(
+            self.model, 'search_read',
+            [domain], {'fields': self.fields, 'order': 'write_date asc, id asc',
+                       'limit': self.batch_size, 'context': {'active_test': False}}
+        )
+
+    async def poll(self) -> List[int]:
+        """Lit les modifications depuis le filigrane et retourne les IDs modifiés"""
+        initial = self.watermark is None
+        watermark = self.watermark
+        changed: List[int] = []
+        self._forgotten = set()
+        try:
+            await self._read_changes(initial, changed)
+            removed = [] if initial else await self._reconcile()
+            # Une écriture de l'API pendant l'interrogation a pu être lue avant
+            # d'être appliquée: ces enregistrements seront relus la fois suivante
+            forgotten, self._forgotten = self._forgotten, None
+            self.forget(forgotten)
+        except BaseException:
+            # Pages déjà appliquées mais jamais signalées: elles sont retirées de
+            # l'instantané et relues depuis l'ancien filigrane la fois suivante
+            self.watermark = watermark
+            self.forget(changed)
+            raise
+        finally:
+            self._forgotten = None
+
+        if not self.mirror:
+            self._prune()
+        self.polls += 1
+        self.synced_at = time.monotonic()
+        self.last_error = None
+        if changed or removed:
+            if not initial:
+                logger.info(f"{self.model}: {len(changed)} modification(s), {len(removed)} suppression(s)")
+            await self._notify(changed, removed, initial)
+        return changed
+
+    async def _notify(self, changed: List[int], removed: List[int], initial: bool):
+        self.changes += len(changed) + len(removed)
+        if self.on_change is None:
+            return
+        try:
+            result = self.on_change(changed, removed, initial)
+            if inspect.isawaitable(result):
+                await result
+        except BaseException:
+            self.forget(changed)
+            raise
+
+    async def _read_changes(self, initial: bool, changed: List[int]):
+        """Parcourt par pages (write_date, id) les enregistrements modifiés"""
+        if initial and not self.mirror:
+            await self._read_watermark()
+            return
+        if initial:
+            cursor = None
+        else:
+            since = datetime.strptime(self.watermark, ODOO_DATETIME_FORMAT) - timedelta(seconds=self.overlap)
+            cursor = since.strftime(ODOO_DATETIME_FORMAT)
+
+        operator = '>='
+        while True:
+            page = await self._search_read([('write_date', operator, cursor)] if cursor else [])
+            self._apply(page, changed)
+            if len(page) < self.batch_size:
+                break
+            last = page[-1]['write_date']
+            operator = '>='
+            if page[0]['write_date'] == last:
+                # Page entière dans la même seconde: cette seconde est parcourue par ID
+                last_id = page[-1]['id']
+                while True:
+                    same_second = await self._search_read([('write_date', '=', last), ('id', '>', last_id)])
+                    self._apply(same_second, changed)
+                    if len(same_second) < self.batch_size:
+                        break
+                    last_id = same_second[-1]['id']
+                operator = '>'
+            cursor = last
+
+        if initial:
+            self._reconciled_at = time.monotonic()
+
+    async def _read_watermark(self):
+        """Démarre le suivi à la dernière write_date, sans lire le modèle"""
+        self.queries += 1
+        latest = await self.client.execute_kw(
+            self.model, 'search_read',
+            [[]], {'fields': ['write_date'], 'order': 'write_date desc, id desc',
+                   'limit': 1, 'context': {'active_test': False}}
+        )
+        self.watermark = latest[0]['write_date'] if latest else EPOCH
+        self._reconciled_at = time.monotonic()
+
+    def _prune(self):
+        """Oublie les enregistrements sortis de la marge de relecture"""
+        since = datetime.strptime(self.watermark, ODOO_DATETIME_FORMAT) - timedelta(seconds=self.overlap)
+        cutoff = since.strftime(ODOO_DATETIME_FORMAT)
+        for record_id in [record_id for record_id, record in self.snapshot.items()
+                          if record['write_date'] < cutoff]:
+            del self.snapshot[record_id]
+
+    def _apply(self, records: List[Dict[str, Any]], changed: List[int]):
+        for record in records:
+            current = self.snapshot.get(record['id'])
+            if current is None or current != record:
+                self.snapshot[record['id']] = record
+                changed.append(record['id'])
+            if self.watermark is None or record['write_date'] > self.watermark:
+                self.watermark = record['write_date']
+
+    async def _reconcile(self) -> List[int]:
+        """Détecte les enregistrements supprimés (un search d'IDs seulement)"""
+        if time.monotonic() - self._reconciled_at < self.reconcile_interval:
+            return []
+        if self.mirror:
+            self.queries += 1
+            existing = set(await self.client.execute_kw(
+                self.model, 'search', [[]], {'context': {'active_test': False}}
+            ))
+            removed = [record_id for record_id in self.snapshot if record_id not in existing]
+        else:
+            record_ids = sorted(set(self.tracked())) if self.tracked is not None else []
+            existing = set()
+            for start in range(0, len(record_ids), self.batch_size):
+                self.queries += 1
+                existing.update(await self.client.execute_kw(
+                    self.model, 'search', [[('id', 'in', record_ids[start:start + self.batch_size])]],
+                    {'context': {'active_test': False}}
+                ))
+            removed = [record_id for record_id in record_ids if record_id not in existing]
+        self._reconciled_at = time.monotonic()
+        self.forget(removed)
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "records": len(self.snapshot),
+            "watermark": self.watermark,
+            "lag_seconds": round(time.monotonic() - self.synced_at, 1) if self.synced_at is not None else None,
+            "polls": self.polls,
+            "queries": self.queries,
+            "changes": self.changes,
+            "last_error": self.last_error,
+        }
+
+
+class ChangeFeedPoller:
+    """Interroge périodiquement plusieurs ChangeFeed en tâche de fond"""
+
+    def __init__(self, feeds: List[ChangeFeed], interval: float = 5.0,
+                 ready: Callable[[], bool] = lambda: True):
+        self.feeds = feeds
+        self.interval = interval
+        self.ready = ready
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run(), name="odoo-change-feed")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            if self.ready():
+                for feed in self.feeds:
+                    try:
+                        await feed.poll()
+                    except Exception as e:
+                        feed.last_error = str(e) or type(e).__name__
+                        logger.warning(f"Suivi des modifications de {feed.model} impossible: {feed.last_error}")
+            await asyncio.sleep(self.interval)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"interval": self.interval, **{feed.model: feed.stats() for feed in self.feeds}}
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Système de provisionnement IAM pour Odoo
+Clés d'idempotence (en-tête Idempotency-Key) des endpoints de création
+
+Auteur: Système IAM Odoo
+Date: 2025-05-28
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Dict, Any
+
+
+class IdempotencyConflict(Exception):
+    """La clé a déjà servi pour une requête différente"""
+
+
+class IdempotencyInProgress(Exception):
+    """La première requête portant cette clé est toujours en cours"""
+
+
+class IdempotencyStore:
+    """
+    Résultats des requêtes portant une clé d'idempotence, partagés par les workers.
+
+    La première requête réserve la clé (état "pending", avec un bail);
+    les requêtes identiques qui arrivent pendant son exécution attendent
+    son résultat, celles qui arrivent ensuite le rejouent sans appeler Odoo.
+    Si le processus qui détient la clé meurt, elle est reprise à
+    l'expiration du bail; tant que la requête s'exécute, hold() prolonge
+    le bail. Les accès SQLite (verrou d'écriture, attente d'un autre
+    processus) se font hors de la boucle d'événements. Le fichier n'est
+    lisible que par son propriétaire (0600).
+    """
+
+    def __init__(self, path: str, lease_duration: float = 60.0, ttl: float = 24 * 3600.0,
+                 poll_interval: float = 0.05):
+        self.path = path
+        self.lease_duration = lease_duration
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self.owner = f"{os.getpid()}-{id(self)}"
+        self.replays = 0
+        self._local = threading.local()
+        os.close(os.open(path, os.O_RDWR | os.O_CREAT, 0o600))
+        os.chmod(path, 0o600)
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS idempotency ("
+            " key TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, state TEXT NOT NULL,"
+            " response TEXT, owner TEXT, expires_at REAL NOT NULL, created_at REAL NOT NULL)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        """Une connexion par thread (les connexions sqlite3 ne se partagent pas)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _try_begin(self, key: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """
+        Réserve la clé si elle est libre (retourne {"state": "owner"}), sinon
+        retourne l'état de la requête qui la détient
+        """
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT fingerprint, state, response, expires_at FROM idempotency WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and row[3] > now:
+                if row[0] != fingerprint:
+                    raise IdempotencyConflict(key)
+                if row[1] == "done":
+                    return {"state": "done", "response": json.loads(row[2])}
+                return {"state": "pending"}
+            # Clé libre, expirée, ou abandonnée par un worker arrêté
+            conn.execute(
+                "INSERT OR REPLACE INTO idempotency"
+                " (key, fingerprint, state, response, owner, expires_at, created_at)"
+                " VALUES (?, ?, 'pending', NULL, ?, ?, ?)",
+                (key, fingerprint, self.owner, now + self.lease_duration, now)
+            )
+            return {"state": "owner"}
+        finally:
+            conn.execute("COMMIT")
+
+    async def begin(self, key: str, fingerprint: str, wait_timeout: float = 65.0) -> Optional[Dict[str, Any]]:
+        """
+        Retourne None si l'appelant doit exécuter la requête (il détient alors
+        la clé), ou la réponse enregistrée à rejouer
+        """
+        deadline = time.monotonic() + wait_timeout
+        while True:
+            outcome = await asyncio.to_thread(self._try_begin, key, fingerprint)
+            if outcome["state"] == "owner":
+                return None
+            if outcome["state"] == "done":
+                self.replays += 1
+                return outcome["response"]
+            if time.monotonic() >= deadline:
+                raise IdempotencyInProgress(key)
+            await asyncio.sleep(self.poll_interval)
+
+    def renew(self, key: str) -> bool:
+        """Prolonge le bail d'une clé détenue en attente (False si elle a été perdue)"""
+        cursor = self._connection().execute(
+            "UPDATE idempotency SET expires_at = ? WHERE key = ? AND owner = ? AND state = 'pending'",
+            (time.time() + self.lease_duration, key, self.owner)
+        )
+        return cursor.rowcount > 0
+
+    async def hold(self, key: str):
+        """Prolonge le bail toutes les lease_duration / 3 secondes, jusqu'à annulation"""
+        while True:
+            await asyncio.sleep(self.lease_duration / 3)
+            if not await asyncio.to_thread(self.renew, key):
+                return
+
+    def finish(self, key: str, status_code: int, body: Any, headers: Optional[Dict[str, str]] = None):
+        """Enregistre la réponse à rejouer pendant `ttl` secondes"""
+        response = {"status_code": status_code, "body": body, "headers": headers or {}}
+        self._connection().execute(
+            "UPDATE idempotency SET state = 'done', response = ?, owner = NULL, expires_at = ?"
+            " WHERE key = ? AND owner = ?",
+            (json.dumps(response, ensure_ascii=False), time.time() + self.ttl, key, self.owner)
+        )
+
+    def release(self, key: str):
+        """Libère la clé sans résultat (erreur temporaire: la requête pourra être rejouée)"""
+        self._connection().execute(
+            "DELETE FROM idempotency WHERE key = ? AND owner = ? AND state = 'pending'",
+            (key, self.owner)
+        )
+
+    def purge(self) -> int:
+        """Supprime les clés expirées"""
+        cursor = self._connection().execute(
+            "DELETE FROM idempotency WHERE expires_at < ?", (time.time(),)
+        )
+        return cursor.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        row = self._connection().execute(
+            "SELECT COUNT(*), SUM(state = 'pending') FROM idempotency WHERE expires_at >= ?",
+            (time.time(),)
+        ).fetchone()
+        return {"keys": row[0], "pending": row[1] or 0, "replays": self.replays}
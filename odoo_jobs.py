@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Système de provisionnement IAM pour Odoo
+Tâches de provisionnement asynchrones (file d'attente SQLite durable)
+
+Auteur: Système IAM Odoo
+Date: 2025-05-28
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Optional, List, Dict, Any, Callable, Awaitable, Iterable, Tuple
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = ("queued", "running", "succeeded", "failed")
+
+
+class JobStore:
+    """
+    File d'attente de tâches persistée dans SQLite.
+
+    Une tâche réservée par un worker porte un bail: si le processus meurt
+    pendant l'exécution, la tâche est reprise par un autre worker à
+    l'expiration du bail. Plusieurs processus peuvent partager le fichier.
+    Les tâches contiennent des mots de passe en attendant leur exécution:
+    le fichier n'est lisible que par son propriétaire (0600, comme les
+    fichiers -wal et -shm que SQLite crée avec les mêmes droits).
+    """
+
+    def __init__(self, path: str, lease_duration: float = 60.0):
+        self.path = path
+        self.lease_duration = lease_duration
+        self._local = threading.local()
+        os.close(os.open(path, os.O_RDWR | os.O_CREAT, 0o600))
+        os.chmod(path, 0o600)
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, kind TEXT NOT NULL, payload TEXT NOT NULL,"
+            " status TEXT NOT NULL, progress TEXT, result TEXT, error TEXT,"
+            " attempts INTEGER NOT NULL DEFAULT 0, owner TEXT, lease_expires_at REAL,"
+            " available_at REAL NOT NULL, created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL, finished_at REAL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_pending ON jobs (status, available_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        """Une connexion par thread (les connexions sqlite3 ne se partagent pas)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, kind: str, payload: Dict[str, Any]) -> str:
+        """Ajoute une tâche et retourne son identifiant"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._connection().execute(
+            "INSERT INTO jobs (id, kind, payload, status, available_at, created_at, updated_at)"
+            " VALUES (?, ?, ?, 'queued', ?, ?, ?)",
+            (job_id, kind, json.dumps(payload, ensure_ascii=False), now, now, now)
+        )
+        return job_id
+
+    def claim(self, owner: str) -> Optional[Dict[str, Any]]:
+        """Réserve la plus ancienne tâche prête (ou abandonnée par un worker arrêté)"""
+        conn = self._connection()
+        now = time.time()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE (status = 'queued' AND available_at <= ?)"
+                " OR (status = 'running' AND lease_expires_at < ?)"
+                " ORDER BY available_at LIMIT 1",
+                (now, now)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', owner = ?, lease_expires_at = ?,"
+                " attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (owner, now + self.lease_duration, now, row["id"])
+            )
+            conn.execute("COMMIT")
+        except sqlite3.OperationalError:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            return None
+        job = self._to_dict(row)
+        job["attempts"] += 1
+        return job
+
+    def update_progress(self, job_id: str, progress: Dict[str, Any]):
+        """Enregistre l'avancement et prolonge le bail de la tâche"""
+        now = time.time()
+        self._connection().execute(
+            "UPDATE jobs SET progress = ?, lease_expires_at = ?, updated_at = ?"
+            " WHERE id = ? AND status = 'running'",
+            (json.dumps(progress, ensure_ascii=False), now + self.lease_duration, now, job_id)
+        )
+
+    def complete(self, job_id: str, result: Any):
+        # Le contenu de la requête (mot de passe éventuel) n'est plus conservé
+        now = time.time()
+        self._connection().execute(
+            "UPDATE jobs SET status = 'succeeded', result = ?, error = NULL, payload = '{}',"
+            " owner = NULL, updated_at = ?, finished_at = ? WHERE id = ?",
+            (json.dumps(result, ensure_ascii=False), now, now, job_id)
+        )
+
+    def fail(self, job_id: str, error: str):
+        now = time.time()
+        self._connection().execute(
+            "UPDATE jobs SET status = 'failed', error = ?, payload = '{}',"
+            " owner = NULL, updated_at = ?, finished_at = ? WHERE id = ?",
+            (error, now, now, job_id)
+        )
+
+    def retry(self, job_id: str, error: str, delay: float):
+        """Remet la tâche en file après un échec temporaire"""
+        now = time.time()
+        self._connection().execute(
+            "UPDATE jobs SET status = 'queued', error = ?, owner = NULL,"
+            " available_at = ?, updated_at = ? WHERE id = ?",
+            (error, now + delay, now, job_id)
+        )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row is not None else None
+
+    def get_once(self, job_id: str, fields: Iterable[str], mask: str = "***") -> Optional[Dict[str, Any]]:
+        """
+        Retourne la tâche, puis remplace par `mask` les champs `fields` de
+        son résultat enregistré: une valeur secrète (mot de passe généré)
+        n'est lue qu'une seule fois, même par des appels simultanés
+        """
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            job = self._to_dict(row)
+            result = job["result"]
+            if isinstance(result, dict) and any(result.get(field, mask) != mask for field in fields):
+                stored = {**result, **{field: mask for field in fields if field in result}}
+                conn.execute("UPDATE jobs SET result = ? WHERE id = ?",
+                             (json.dumps(stored, ensure_ascii=False), job_id))
+            return job
+        finally:
+            conn.execute("COMMIT")
+
+    def purge(self, older_than: float) -> int:
+        """Supprime les tâches terminées depuis plus de `older_than` secondes"""
+        cursor = self._connection().execute(
+            "DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?",
+            (time.time() - older_than,)
+        )
+        return cursor.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        rows = self._connection().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = dict.fromkeys(JOB_STATUSES, 0)
+        counts.update({row[0]: row[1] for row in rows})
+        return counts
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        for field in ("payload", "progress", "result"):
+            if job[field] is not None:
+                job[field] = json.loads(job[field])
+        return job
+
+
+JobHandler = Callable[[Dict[str, Any], "JobContext"], Awaitable[Any]]
+
+
+class JobContext:
+    """Informations transmises au traitement d'une tâche"""
+
+    def __init__(self, store: JobStore, job: Dict[str, Any]):
+        self.store = store
+        self.job_id = job["id"]
+        self.attempt = job["attempts"]
+
+    async def progress(self, step: str, completed: int, total: int):
+        await asyncio.to_thread(self.store.update_progress, self.job_id,
+                                {"step": step, "completed": completed, "total": total})
+
+
+class JobWorkerPool:
+    """
+    Pool borné de workers asyncio qui vident la file de tâches.
+
+    Les erreurs `retryable` (Odoo injoignable...) remettent la tâche en file
+    avec un délai croissant, jusqu'à `max_attempts` tentatives; les autres
+    erreurs la terminent en échec. Les transactions SQLite du JobStore
+    (BEGIN IMMEDIATE, jusqu'à 5 s d'attente du verrou) passent par un thread
+    pour ne pas bloquer la boucle d'événements.
+    """
+
+    def __init__(self, store: JobStore, handlers: Dict[str, JobHandler], concurrency: int = 4,
+                 poll_interval: float = 1.0, max_attempts: int = 5,
+                 retryable: Tuple[type, ...] = (), ready: Callable[[], bool] = lambda: True):
+        self.store = store
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retryable = retryable
+        self.ready = ready
+        self.owner = f"{os.getpid()}-{id(self)}"
+        self.running = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self):
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker(), name=f"provisioning-job-{index}")
+                       for index in range(self.concurrency)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self):
+        """Réveille les workers après l'ajout d'une tâche"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _wait(self):
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def _worker(self):
+        while True:
+            job = await asyncio.to_thread(self.store.claim, self.owner) if self.ready() else None
+            if job is None:
+                await self._wait()
+                continue
+            self.running += 1
+            try:
+                await self._execute(job)
+            finally:
+                self.running -= 1
+
+    async def _execute(self, job: Dict[str, Any]):
+        job_id = job["id"]
+        handler = self.handlers.get(job["kind"])
+        if handler is None:
+            await asyncio.to_thread(self.store.fail, job_id, f"Type de tâche inconnu: {job['kind']}")
+            return
+        if job["attempts"] > self.max_attempts:
+            await asyncio.to_thread(self.store.fail, job_id,
+                                    job["error"] or "Nombre maximum de tentatives atteint")
+            return
+
+        try:
+            result = await handler(job["payload"], JobContext(self.store, job))
+        except asyncio.CancelledError:
+            # Arrêt du worker: la tâche sera reprise à l'expiration du bail
+            raise
+        except self.retryable as e:
+            error = str(e) or type(e).__name__
+            if job["attempts"] >= self.max_attempts:
+                await asyncio.to_thread(self.store.fail, job_id, error)
+            else:
+                delay = min(2 ** job["attempts"], 60)
+                logger.warning(f"Tâche {job_id} en échec temporaire ({error}), "
+                               f"nouvelle tentative dans {delay}s")
+                await asyncio.to_thread(self.store.retry, job_id, error, delay)
+        except Exception as e:
+            logger.error(f"Tâche {job_id} en échec: {e}")
+            await asyncio.to_thread(self.store.fail, job_id, str(e) or type(e).__name__)
+        else:
+            await asyncio.to_thread(self.store.complete, job_id, result)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"workers": self.concurrency, "running": self.running, **self.store.counts()}
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Système de provisionnement IAM pour Odoo
+Métriques de l'API de provisionnement au format texte Prometheus
+
+Auteur: Système IAM Odoo
+Date: 2025-05-28
+"""
+
+import json
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional, List, Dict, Any, Iterable, Tuple
+
+from starlette.responses import JSONResponse
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Temps de sérialisation cumulés pendant la requête HTTP en cours
+_serialization_time: ContextVar[Optional[List[float]]] = ContextVar("serialization_time", default=None)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    content = ','.join(f'{name}="{_escape(value)}"' for name, value in labels)
+    return '{' + content + '}' if content else ''
+
+
+class Histogram:
+    """Histogramme Prometheus à étiquettes (buckets cumulés, somme, nombre)"""
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...],
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self.series: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        with self._lock:
+            serie = self.series.get(labels)
+            if serie is None:
+                serie = self.series[labels] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    serie["buckets"][index] += 1
+                    break
+            serie["sum"] += value
+            serie["count"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "help": self.help,
+                "labelnames": list(self.labelnames),
+                "buckets": list(self.buckets),
+                "series": {json.dumps(labels): dict(serie, buckets=list(serie["buckets"]))
+                           for labels, serie in self.series.items()},
+            }
+
+
+class MetricsRegistry:
+    """Ensemble des histogrammes d'un processus"""
+
+    def __init__(self):
+        self.histograms: Dict[str, Histogram] = {}
+
+    def histogram(self, name: str, help: str, labelnames: Tuple[str, ...],
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        if name not in self.histograms:
+            self.histograms[name] = Histogram(name, help, labelnames, buckets)
+        return self.histograms[name]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """État sérialisable en JSON, pour l'agrégation entre workers"""
+        return {name: histogram.snapshot() for name, histogram in self.histograms.items()}
+
+
+def merge_snapshots(snapshots: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Additionne les histogrammes de plusieurs workers"""
+    merged: Dict[str, Any] = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot.items():
+            target = merged.setdefault(name, dict(metric, series={}))
+            for key, serie in metric["series"].items():
+                current = target["series"].get(key)
+                if current is None:
+                    target["series"][key] = dict(serie, buckets=list(serie["buckets"]))
+                else:
+                    current["buckets"] = [a + b for a, b in zip(current["buckets"], serie["buckets"])]
+                    current["sum"] += serie["sum"]
+                    current["count"] += serie["count"]
+    return merged
+
+
+def render_prometheus(snapshot: Dict[str, Any]) -> str:
+    """Produit le format d'exposition texte de Prometheus (version 0.0.4)"""
+    lines = []
+    for name, metric in sorted(snapshot.items()):
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} histogram")
+        for key, serie in sorted(metric["series"].items()):
+            labels = list(zip(metric["labelnames"], json.loads(key)))
+            cumulative = 0
+            for bound, count in zip(metric["buckets"], serie["buckets"]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labels + [('le', repr(float(bound)))])} {cumulative}")
+            lines.append(f"{name}_bucket{_format_labels(labels + [('le', '+Inf')])} {serie['count']}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {serie['sum']}")
+            lines.append(f"{name}_count{_format_labels(labels)} {serie['count']}")
+    return "\n".join(lines) + "\n"
+
+
+class RPCMetrics:
+    """
+    Instrumentation des appels Odoo, branchée sur les clients de odoo_rpc.
+
+    - odoo_rpc_duration_seconds: durée d'un execute_kw (réseau + traitement Odoo),
+      par modèle, méthode et résultat
+    - odoo_rpc_queue_seconds: attente d'une connexion ou d'un thread libre
+      avant l'envoi de l'appel
+    """
+
+    def __init__(self, registry: MetricsRegistry):
+        self.duration = registry.histogram(
+            "odoo_rpc_duration_seconds",
+            "Durée des appels execute_kw vers Odoo",
+            ("model", "method", "outcome"),
+        )
+        self.queue = registry.histogram(
+            "odoo_rpc_queue_seconds",
+            "Attente d'une connexion ou d'un thread RPC libre avant l'appel Odoo",
+            ("transport",),
+        )
+
+    def observe_call(self, model: str, method: str, seconds: float, outcome: str = "ok"):
+        self.duration.observe(seconds, model, method, outcome)
+
+    def observe_queue(self, transport: str, seconds: float):
+        self.queue.observe(seconds, transport)
+
+
+class TimedJSONResponse(JSONResponse):
+    """Réponse JSON qui mesure le temps d'encodage de son contenu"""
+
+    def render(self, content: Any) -> bytes:
+        start = time.perf_counter()
+        try:
+            return super().render(content)
+        finally:
+            elapsed = _serialization_time.get()
+            if elapsed is not None:
+                elapsed[0] += time.perf_counter() - start
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI mesurant la durée de chaque requête HTTP, étiquetée par
+    le modèle de route (/users/{user_id}) plutôt que par l'URL réelle, ainsi
+    que le temps passé à encoder la réponse JSON (voir TimedJSONResponse).
+    """
+
+    def __init__(self, app, registry: MetricsRegistry):
+        self.app = app
+        self.requests = registry.histogram(
+            "odoo_api_request_duration_seconds",
+            "Durée totale des requêtes HTTP de l'API",
+            ("method", "route", "status"),
+        )
+        self.serialization = registry.histogram(
+            "odoo_api_serialization_seconds",
+            "Temps d'encodage JSON des réponses de l'API",
+            ("method", "route"),
+        )
+        self._route_paths: Optional[Dict[Any, str]] = None
+
+    def _route_path(self, scope) -> str:
+        """Modèle de la route choisie par le routeur (d'après son endpoint)"""
+        if self._route_paths is None:
+            self._route_paths = {}
+            for route in scope["app"].router.routes:
+                self._route_paths.setdefault(getattr(route, "endpoint", None), route.path)
+        return self._route_paths.get(scope.get("endpoint"), "non_route")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+        serialization = [0.0]
+        token = _serialization_time.set(serialization)
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _serialization_time.reset(token)
+            route = self._route_path(scope)
+            self.requests.observe(time.perf_counter() - start,
+                                  scope["method"], route, str(status_code))
+            if serialization[0]:
+                self.serialization.observe(serialization[0], scope["method"], route)
@@ -0,0 +1,827 @@
+#!/usr/bin/env python3
+"""
+Système de provisionnement IAM pour Odoo
+Clients RPC partagés par l'API de provisionnement
+
+Auteur: Système IAM Odoo
+Date: 2025-05-28
+"""
+
+import abc
+import asyncio
+import collections
+import contextvars
+import copy
+import functools
+import http.client
+import itertools
+import json
+import logging
+import queue
+import random
+import threading
+import time
+import xmlrpc.client
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Optional, List, Dict, Any, Callable, Awaitable, Tuple
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+
+class OdooRPCError(Exception):
+    """Erreur renvoyée par Odoo dans une réponse JSON-RPC"""
+
+    def __init__(self, message: str, data: Optional[Dict[str, Any]] = None):
+        super().__init__(message)
+        self.data = data or {}
+
+
+# Méthodes Odoo en lecture seule: les appels identiques simultanés sont fusionnés
+COALESCED_METHODS = frozenset({
+    'read', 'search', 'search_read', 'search_count', 'name_search', 'fields_get', 'read_group',
+})
+
+
+# Portée des lectures fusionnées: deux lectures ne partagent un appel que si
+# elles ont été lancées avec la même portée (voir UserCache dans odoo_cache)
+coalescing_scope: "contextvars.ContextVar[Any]" = contextvars.ContextVar("coalescing_scope", default=None)
+
+
+class SingleFlight:
+    """
+    Fusion des appels identiques en cours ("single flight").
+
+    Le premier appelant lance l'appel; ceux qui arrivent avant sa fin
+    attendent le même résultat (ou la même erreur) au lieu de solliciter
+    Odoo à nouveau. Chaque appelant reçoit sa propre copie du résultat.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Any, List[Any]] = {}  # clé -> [tâche, nombre d'appelants en attente]
+        self.leaders = 0
+        self.followers = 0
+
+    async def do(self, key: Any, factory: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            self.leaders += 1
+            call = self._calls[key] = [asyncio.ensure_future(factory()), 1]
+            call[0].add_done_callback(functools.partial(self._done, key))
+        else:
+            self.followers += 1
+            call[1] += 1
+        # shield: l'annulation d'un appelant n'interrompt pas l'appel partagé
+        result = await asyncio.shield(call[0])
+        return copy.deepcopy(result) if call[1] > 1 else result
+
+    def _done(self, key: Any, task: asyncio.Task):
+        self._calls.pop(key, None)
+        if not task.cancelled():
+            task.exception()  # Erreur consommée même si tous les appelants ont abandonné
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": len(self._calls), "calls": self.leaders, "coalesced": self.followers}
+
+
+def coalescing_key(model: str, method: str, args: List[Any],
+                   kwargs: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Clé identifiant un appel en lecture seule (None si l'appel ne doit pas être fusionné)"""
+    if method not in COALESCED_METHODS:
+        return None
+    return json.dumps([model, method, args, kwargs or {}], sort_keys=True, default=str)
+
+
+class _TimeoutTransportMixin:
+    """Ajoute un délai d'attente réglable à un transport XML-RPC keep-alive"""
+
+    def __init__(self, timeout: float, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.timeout = timeout
+
+    def make_connection(self, host):
+        # Le transport réutilise la même connexion HTTP/1.1 entre les appels;
+        # on applique le délai à chaque appel pour gérer les timeouts ponctuels
+        conn = super().make_connection(host)
+        conn.timeout = self.timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(self.timeout)
+        return conn
+
+
+class TimeoutTransport(_TimeoutTransportMixin, xmlrpc.client.Transport):
+    pass
+
+
+class TimeoutSafeTransport(_TimeoutTransportMixin, xmlrpc.client.SafeTransport):
+    pass
+
+
+class OdooConnectionPool:
+    """
+    Pool de connexions XML-RPC vers Odoo, utilisable depuis plusieurs threads.
+
+    Chaque connexion du pool possède son propre ServerProxy (qui n'est pas
+    thread-safe) et garde sa connexion HTTP ouverte entre les appels.
+    Une connexion n'est prêtée qu'à un seul thread à la fois.
+    """
+
+    def __init__(self, url: str, db: str, username: str, password: str,
+                 pool_size: int = 10, timeout: float = 30.0,
+                 acquire_timeout: Optional[float] = None):
+        self.url = url.rstrip('/')
+        self.db = db
+        self.username = username
+        self.password = password
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.acquire_timeout = acquire_timeout if acquire_timeout is not None else timeout
+        self.uid: Optional[int] = None
+
+        self._idle: "queue.LifoQueue[xmlrpc.client.ServerProxy]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._lock = threading.Lock()
+        self._created = 0
+
+    def _new_proxy(self, endpoint: str) -> xmlrpc.client.ServerProxy:
+        """Crée un ServerProxy avec son propre transport keep-alive"""
+        if self.url.startswith('https'):
+            transport = TimeoutSafeTransport(self.timeout)
+        else:
+            transport = TimeoutTransport(self.timeout)
+        return xmlrpc.client.ServerProxy(f"{self.url}/xmlrpc/2/{endpoint}",
+                                         transport=transport, allow_none=True)
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None):
+        """Emprunte une connexion 'object' du pool pour la durée du bloc"""
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise TimeoutError(
+                f"Aucune connexion Odoo disponible après {self.acquire_timeout}s "
+                f"(pool de {self.pool_size})"
+            )
+        try:
+            try:
+                proxy = self._idle.get_nowait()
+            except queue.Empty:
+                proxy = self._new_proxy('object')
+                with self._lock:
+                    self._created += 1
+
+            proxy('transport').timeout = timeout if timeout is not None else self.timeout
+            try:
+                yield proxy
+            except xmlrpc.client.Fault:
+                # Erreur applicative Odoo: la connexion reste utilisable
+                self._idle.put(proxy)
+                raise
+            except Exception:
+                # Erreur réseau ou protocole: la connexion est abandonnée
+                proxy('close')()
+                with self._lock:
+                    self._created -= 1
+                raise
+            else:
+                self._idle.put(proxy)
+        finally:
+            self._slots.release()
+
+    def authenticate(self) -> Optional[int]:
+        """Authentifie le compte technique et mémorise l'UID"""
+        common = self._new_proxy('common')
+        try:
+            self.uid = common.authenticate(self.db, self.username, self.password, {}) or None
+        finally:
+            common('close')()
+        return self.uid
+
+    def execute_kw(self, model: str, method: str, args: List[Any],
+                   kwargs: Optional[Dict[str, Any]] = None,
+                   timeout: Optional[float] = None) -> Any:
+        """Exécute une méthode Odoo via une connexion du pool"""
+        with self.connection(timeout) as proxy:
+            return proxy.execute_kw(self.db, self.uid, self.password,
+                                    model, method, args, kwargs or {})
+
+    def stats(self) -> Dict[str, int]:
+        """État courant du pool (pour le diagnostic)"""
+        return {
+            "pool_size": self.pool_size,
+            "open_connections": self._created,
+            "idle_connections": self._idle.qsize(),
+        }
+
+    def close(self):
+        """Ferme toutes les connexions inactives du pool"""
+        while True:
+            try:
+                proxy = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            proxy('close')()
+            with self._lock:
+                self._created -= 1
+
+
+class OdooUnavailableError(Exception):
+    """Appel refusé sans solliciter Odoo (circuit ouvert ou trop d'appels en attente)"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Limite adaptative du nombre d'appels Odoo simultanés (AIMD guidé par la latence).
+
+    Chaque appel est comparé à la latence de référence de sa propre
+    opération (modèle, méthode): le minimum de ses moyennes mobiles sur les
+    deux dernières fenêtres de `baseline_window` secondes. Un `read` rapide
+    et un `create` lent ne se servent donc pas mutuellement de référence, et
+    la référence remonte d'elle-même après une fenêtre si l'opération est
+    durablement plus lente. Le rapport latence/référence est lissé sur
+    l'ensemble des appels: tant qu'il reste proche de 1 et que la limite est
+    utilisée, elle augmente d'environ un appel par aller-retour (elle double
+    à chaque aller-retour jusqu'à la première réduction, comme le "slow
+    start" de TCP); s'il dépasse `latency_tolerance`, ou en cas d'erreur
+    réseau, elle est multipliée par `backoff_ratio` (au plus une fois par
+    aller-retour). Les appels au-delà de la limite attendent leur tour, au
+    plus `max_wait` secondes.
+    """
+
+    def __init__(self, initial_limit: int = 20, min_limit: int = 2, max_limit: int = 200,
+                 latency_tolerance: float = 2.0, backoff_ratio: float = 0.9,
+                 max_wait: float = 10.0, baseline_window: float = 60.0):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_tolerance = latency_tolerance
+        self.backoff_ratio = backoff_ratio
+        self.max_wait = max_wait
+        self.baseline_window = baseline_window
+
+        self.in_flight = 0
+        self.latency: Optional[float] = None  # Moyenne rapide, toutes opérations (~5 appels)
+        self.latency_ratio: Optional[float] = None  # Latence / référence, lissée
+        self.rejected = 0
+        self._last_decrease = 0.0
+        self._slow_start = True
+        # (modèle, méthode) -> [moyenne rapide, minimum de la fenêtre courante,
+        #                       minimum de la fenêtre précédente, début de la fenêtre]
+        self._operations: Dict[Any, List[Any]] = {}
+        self._waiters: "collections.deque[asyncio.Future]" = collections.deque()
+
+    async def acquire(self):
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done():
+                # Place attribuée au dernier moment: on la rend
+                self._release_slot()
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.rejected += 1
+            raise OdooUnavailableError(
+                f"Odoo saturé: {len(self._waiters)} appels en attente "
+                f"(limite de {int(self.limit)} appels simultanés)", retry_after=1.0
+            )
+
+    def release(self, latency: float, failed: bool, operation: Any = None):
+        """Libère la place et ajuste la limite selon la latence observée pour `operation`"""
+        now = time.monotonic()
+        if failed:
+            self._decrease(now)
+        else:
+            self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+            ratio = latency / max(self._baseline(operation, latency, now), 1e-6)
+            self.latency_ratio = ratio if self.latency_ratio is None else 0.8 * self.latency_ratio + 0.2 * ratio
+            if self.latency_ratio > self.latency_tolerance:
+                self._decrease(now)
+            elif self.in_flight >= self.limit / 2:
+                step = 1.0 if self._slow_start else 1.0 / self.limit
+                self.limit = min(self.max_limit, self.limit + step)
+        self._release_slot()
+
+    def _baseline(self, operation: Any, latency: float, now: float) -> float:
+        """Met à jour la latence de l'opération et retourne sa latence de référence"""
+        state = self._operations.get(operation)
+        if state is None:
+            state = self._operations[operation] = [latency, latency, latency, now]
+        else:
+            state[0] = 0.8 * state[0] + 0.2 * latency
+            if now - state[3] >= self.baseline_window:
+                # Nouvelle fenêtre: l'ancien minimum est oublié à la suivante
+                state[2], state[1], state[3] = state[1], state[0], now
+            else:
+                state[1] = min(state[1], state[0])
+        return min(state[1], state[2])
+
+    def _decrease(self, now: float):
+        if now - self._last_decrease >= (self.latency or 0.0):
+            self._slow_start = False
+            self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+            self._last_decrease = now
+
+    def _release_slot(self):
+        self.in_flight -= 1
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "latency_ratio": round(self.latency_ratio, 2) if self.latency_ratio is not None else None,
+            "operations": len(self._operations),
+            "rejected": self.rejected,
+        }
+
+
+class CircuitBreaker:
+    """
+    Disjoncteur devant Odoo.
+
+    "closed": les appels passent; si au moins `min_calls` appels ont eu lieu
+    parmi les `window_size` derniers (sur au plus `window` secondes) et que la proportion d'échecs
+    réseau atteint `failure_threshold`, le circuit s'ouvre.
+    "open": les appels sont refusés immédiatement pendant `open_duration`
+    secondes (durée doublée à chaque réouverture, jusqu'à `max_open_duration`).
+    "half_open": un seul appel d'essai; son succès referme le circuit.
+    """
+
+    def __init__(self, failure_threshold: float = 0.5, min_calls: int = 20, window: float = 30.0,
+                 window_size: int = 100, open_duration: float = 5.0, max_open_duration: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.min_calls = min_calls
+        self.window = window
+        self.open_duration = open_duration
+        self.max_open_duration = max_open_duration
+
+        self.state = "closed"
+        self.opened_until = 0.0
+        self.trips = 0
+        self.rejected = 0
+        self._current_open_duration = open_duration
+        self._probe_in_flight = False
+        self._outcomes: "collections.deque[Tuple[float, bool]]" = collections.deque(maxlen=window_size)
+
+    def retry_after(self) -> float:
+        """Délai (secondes) avant que le circuit accepte de nouveau un appel"""
+        return max(0.0, self.opened_until - time.monotonic())
+
+    def before_call(self):
+        """Refuse l'appel si le circuit est ouvert"""
+        if self.state == "open":
+            if time.monotonic() < self.opened_until:
+                self.rejected += 1
+                raise OdooUnavailableError("Circuit Odoo ouvert après des échecs répétés",
+                                           retry_after=self.retry_after())
+            self.state = "half_open"
+        if self.state == "half_open":
+            if self._probe_in_flight:
+                self.rejected += 1
+                raise OdooUnavailableError("Circuit Odoo en cours de test", retry_after=1.0)
+            self._probe_in_flight = True
+
+    def record(self, failed: Optional[bool]):
+        """Enregistre le résultat d'un appel (None: appel annulé, résultat inconnu)"""
+        now = time.monotonic()
+        if self.state == "half_open":
+            self._probe_in_flight = False
+            if failed:
+                self._open(now)
+            elif failed is not None:
+                logger.info("Circuit Odoo refermé")
+                self.state = "closed"
+                self._current_open_duration = self.open_duration
+                self._outcomes.clear()
+            return
+        if failed is None or self.state != "closed":
+            return
+
+        self._outcomes.append((now, failed))
+        while self._outcomes and self._outcomes[0][0] < now - self.window:
+            self._outcomes.popleft()
+        failures = sum(1 for _, outcome in self._outcomes if outcome)
+        if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_threshold:
+            self._open(now)
+
+    def _open(self, now: float):
+        self.state = "open"
+        self.opened_until = now + self._current_open_duration
+        self.trips += 1
+        logger.warning(f"Circuit Odoo ouvert pour {self._current_open_duration:g}s")
+        self._current_open_duration = min(self._current_open_duration * 2, self.max_open_duration)
+        self._outcomes.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        calls = len(self._outcomes)
+        failures = sum(1 for _, outcome in self._outcomes if outcome)
+        return {
+            "state": self.state,
+            "error_rate": round(failures / calls, 3) if calls else 0.0,
+            "window_calls": calls,
+            "retry_after": round(self.retry_after(), 1) if self.state == "open" else None,
+            "trips": self.trips,
+            "rejected": self.rejected,
+        }
+
+
+class OdooCallGuard:
+    """Disjoncteur puis limiteur adaptatif, appliqués à chaque appel execute_kw"""
+
+    def __init__(self, limiter: AdaptiveConcurrencyLimiter, breaker: CircuitBreaker,
+                 rejection: Callable[[str, float], Exception] = OdooUnavailableError):
+        self.limiter = limiter
+        self.breaker = breaker
+        self.rejection = rejection
+
+    async def run(self, factory: Callable[[], Awaitable[Any]], failures: Tuple[type, ...],
+                  operation: Any = None) -> Any:
+        try:
+            self.breaker.before_call()
+            try:
+                await self.limiter.acquire()
+            except BaseException:
+                self.breaker.record(None)
+                raise
+        except OdooUnavailableError as e:
+            raise self.rejection(str(e), e.retry_after) from e
+
+        start = time.monotonic()
+        failed: Optional[bool] = None
+        try:
+            result = await factory()
+            failed = False
+            return result
+        except failures:
+            failed = True
+            raise
+        except Exception:
+            failed = False  # Erreur applicative Odoo: le service répond
+            raise
+        finally:
+            self.limiter.release(time.monotonic() - start, bool(failed), operation)
+            self.breaker.record(failed)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"limiter": self.limiter.stats(), "circuit_breaker": self.breaker.stats()}
+
+
+class OdooClientBase(abc.ABC):
+    """
+    Partie commune des clients asynchrones: fusion des lectures identiques,
+    protection par disjoncteur et limiteur, instrumentation optionnelle.
+    """
+
+    transport = ""
+    connection_errors: Tuple[type, ...] = (OSError,)
+
+    def __init__(self):
+        self.on_connection_error: Optional[Callable[[Exception], None]] = None
+        self.metrics = None  # RPCMetrics (odoo_metrics), optionnel
+        self.guard: Optional[OdooCallGuard] = None
+        self.single_flight = SingleFlight()
+        self.write_generation = 0  # Incrémenté au début et à la fin de chaque écriture
+
+    async def execute_kw(self, model: str, method: str, args: List[Any],
+                         kwargs: Optional[Dict[str, Any]] = None,
+                         timeout: Optional[float] = None) -> Any:
+        """
+        Exécute une méthode Odoo sans bloquer la boucle d'événements.
+        Une lecture ne rejoint qu'une lecture identique lancée depuis la
+        dernière écriture de ce client, et dans la même portée (coalescing_scope):
+        elle ne reçoit jamais des données antérieures à une écriture déjà faite.
+        """
+        key = coalescing_key(model, method, args, kwargs)
+        if key is not None:
+            return await self.single_flight.do(
+                (self.write_generation, coalescing_scope.get(), key),
+                lambda: self._guarded(model, method, args, kwargs, timeout))
+        self.write_generation += 1
+        try:
+            return await self._guarded(model, method, args, kwargs, timeout)
+        finally:
+            self.write_generation += 1
+
+    async def _guarded(self, model: str, method: str, args: List[Any],
+                       kwargs: Optional[Dict[str, Any]], timeout: Optional[float]) -> Any:
+        if self.guard is None:
+            return await self._execute_kw(model, method, args, kwargs, timeout)
+        return await self.guard.run(
+            lambda: self._execute_kw(model, method, args, kwargs, timeout),
+            self.connection_errors, (model, method)
+        )
+
+    @abc.abstractmethod
+    async def _execute_kw(self, model: str, method: str, args: List[Any],
+                          kwargs: Optional[Dict[str, Any]], timeout: Optional[float]) -> Any:
+        """Appel réel à Odoo, propre à chaque transport"""
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {"single_flight": self.single_flight.stats()}
+        if self.guard is not None:
+            stats.update(self.guard.stats())
+        return stats
+
+
+class ThreadedOdooClient(OdooClientBase):
+    """
+    Interface asynchrone au-dessus du pool XML-RPC.
+
+    Les appels bloquants s'exécutent dans un pool de threads dédié, dimensionné
+    comme le pool de connexions, sans consommer le pool de threads de l'API.
+    """
+
+    transport = "xmlrpc"
+    connection_errors = (OSError, xmlrpc.client.ProtocolError, http.client.HTTPException)
+
+    def __init__(self, pool: OdooConnectionPool):
+        super().__init__()
+        self.pool = pool
+        self._executor = ThreadPoolExecutor(max_workers=pool.pool_size,
+                                            thread_name_prefix="odoo-rpc")
+
+    @property
+    def uid(self) -> Optional[int]:
+        return self.pool.uid
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor,
+                                          functools.partial(func, *args, **kwargs))
+
+    async def authenticate(self) -> Optional[int]:
+        return await self._run(self.pool.authenticate)
+
+    async def _execute_kw(self, model: str, method: str, args: List[Any],
+                          kwargs: Optional[Dict[str, Any]], timeout: Optional[float]) -> Any:
+        # Horodatages pris dans le thread: l'attente d'un thread libre est
+        # mesurée séparément de la durée de l'appel XML-RPC lui-même
+        timings = {"submitted": time.perf_counter()}
+
+        def call():
+            timings["started"] = time.perf_counter()
+            try:
+                return self.pool.execute_kw(model, method, args, kwargs, timeout=timeout)
+            finally:
+                timings["finished"] = time.perf_counter()
+
+        outcome = "ok"
+        try:
+            return await self._run(call)
+        except xmlrpc.client.Fault:
+            outcome = "odoo_error"
+            raise
+        except self.connection_errors as e:
+            outcome = "connection_error"
+            if self.on_connection_error:
+                self.on_connection_error(e)
+            raise
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            if self.metrics is not None and "finished" in timings:
+                self.metrics.observe_queue(self.transport, timings["started"] - timings["submitted"])
+                self.metrics.observe_call(model, method, timings["finished"] - timings["started"],
+                                          outcome)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"transport": self.transport, **self.pool.stats(), **super().stats()}
+
+    async def aclose(self):
+        self.pool.close()
+        self._executor.shutdown(wait=False)
+
+
+class AsyncOdooClient(OdooClientBase):
+    """
+    Client JSON-RPC non bloquant vers Odoo.
+
+    Toutes les requêtes partagent une session aiohttp avec connexions
+    keep-alive: un seul worker peut garder des centaines d'appels en vol.
+    """
+
+    transport = "jsonrpc"
+    connection_errors = (OSError, aiohttp.ClientError, asyncio.TimeoutError)
+
+    def __init__(self, url: str, db: str, username: str, password: str,
+                 max_connections: int = 200, timeout: float = 30.0):
+        super().__init__()
+        self.url = url.rstrip('/')
+        self.db = db
+        self.username = username
+        self.password = password
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.uid: Optional[int] = None
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._ids = itertools.count(1)
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Session HTTP créée à la première utilisation, dans la boucle courante"""
+        if self._session is None or self._session.closed:
+            # Mesure de l'attente d'une connexion libre quand la limite est atteinte
+            trace = aiohttp.TraceConfig()
+            trace.on_connection_queued_start.append(self._on_queued_start)
+            trace.on_connection_queued_end.append(self._on_queued_end)
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                trace_configs=[trace],
+            )
+        return self._session
+
+    @staticmethod
+    async def _on_queued_start(session, context, params):
+        context.trace_request_ctx["queued_at"] = time.perf_counter()
+
+    @staticmethod
+    async def _on_queued_end(session, context, params):
+        timings = context.trace_request_ctx
+        timings["queued"] = time.perf_counter() - timings.pop("queued_at")
+
+    async def call(self, service: str, method: str, *args,
+                   timeout: Optional[float] = None) -> Any:
+        """Appelle une méthode d'un service Odoo (common, object...)"""
+        payload = {
+            "jsonrpc": "2.0",
+            "method": "call",
+            "params": {"service": service, "method": method, "args": list(args)},
+            "id": next(self._ids),
+        }
+        options = {"timeout": aiohttp.ClientTimeout(total=timeout)} if timeout is not None else {}
+        timings = {"queued": 0.0}
+        start = time.perf_counter()
+        outcome = "ok"
+        try:
+            async with self.session.post(f"{self.url}/jsonrpc", json=payload,
+                                         trace_request_ctx=timings, **options) as response:
+                response.raise_for_status()
+                result = await response.json()
+            if result.get("error"):
+                outcome = "odoo_error"
+        except self.connection_errors as e:
+            outcome = "connection_error"
+            if self.on_connection_error:
+                self.on_connection_error(e)
+            raise
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            if self.metrics is not None:
+                # execute_kw: étiquettes modèle/méthode Odoo (res.users, write...)
+                labels = (args[3], args[4]) if service == "object" else (service, method)
+                self.metrics.observe_queue(self.transport, timings["queued"])
+                self.metrics.observe_call(*labels, time.perf_counter() - start - timings["queued"],
+                                          outcome)
+
+        if result.get("error"):
+            error = result["error"]
+            data = error.get("data") or {}
+            raise OdooRPCError(data.get("message") or error.get("message", "Erreur Odoo"), data)
+        return result.get("result")
+
+    async def authenticate(self) -> Optional[int]:
+        """Authentifie le compte technique et mémorise l'UID"""
+        self.uid = await self.call("common", "authenticate",
+                                   self.db, self.username, self.password, {}) or None
+        return self.uid
+
+    async def _execute_kw(self, model: str, method: str, args: List[Any],
+                          kwargs: Optional[Dict[str, Any]], timeout: Optional[float]) -> Any:
+        return await self.call("object", "execute_kw",
+                               self.db, self.uid, self.password,
+                               model, method, args, kwargs or {},
+                               timeout=timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"transport": self.transport, "max_connections": self.max_connections,
+                **super().stats()}
+
+    async def aclose(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+class OdooSessionMonitor:
+    """
+    Authentification Odoo en tâche de fond, avec reconnexion automatique.
+
+    États: "starting" (première connexion en cours), "connected",
+    "reconnecting" (Odoo injoignable ou authentification refusée).
+    Les tentatives sont espacées par un délai exponentiel plafonné; une fois
+    connecté, l'authentification est revérifiée périodiquement et dès qu'un
+    appel RPC échoue au niveau réseau.
+    """
+
+    def __init__(self, client, initial_backoff: float = 0.5, max_backoff: float = 30.0,
+                 check_interval: float = 60.0):
+        self.client = client
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.check_interval = check_interval
+
+        self.state = "starting"
+        self.last_error: Optional[str] = None
+        self.connected_since: Optional[float] = None
+        self.attempts = 0
+
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        client.on_connection_error = self.report_failure
+
+    @property
+    def connected(self) -> bool:
+        return self.state == "connected"
+
+    @property
+    def uid(self) -> Optional[int]:
+        return self.client.uid
+
+    def start(self):
+        """Lance la boucle de connexion sans attendre Odoo"""
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="odoo-session-monitor")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def report_failure(self, error: Exception):
+        """Signale un échec réseau: la connexion est revérifiée immédiatement"""
+        self.last_error = str(error) or type(error).__name__
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _authenticate(self) -> bool:
+        self.attempts += 1
+        try:
+            if await self.client.authenticate():
+                return True
+            self.last_error = "Authentification Odoo refusée"
+        except Exception as e:
+            self.last_error = str(e) or type(e).__name__
+        return False
+
+    async def _run(self):
+        backoff = self.initial_backoff
+        while True:
+            if await self._authenticate():
+                if not self.connected:
+                    logger.info(f"Connexion Odoo établie - UID: {self.uid} ({self.client.transport})")
+                    self.connected_since = time.time()
+                    self.last_error = None
+                self.state = "connected"
+                backoff = self.initial_backoff
+                # Attente d'un signal d'échec ou de la prochaine vérification périodique
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.check_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            if self.state != "starting":
+                self.state = "reconnecting"
+            self.connected_since = None
+            delay = backoff * random.uniform(0.5, 1.0)
+            logger.warning(f"Connexion Odoo impossible ({self.last_error}), "
+                           f"nouvelle tentative dans {delay:.1f}s")
+            await asyncio.sleep(delay)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "uid": self.uid,
+            "attempts": self.attempts,
+            "last_error": self.last_error,
+            "connected_since": self.connected_since,
+        }
@@ -7,17 +7,28 @@ Auteur: Système IAM Odoo
 Date: 2025-05-28
 """
 
+import argparse
 import csv
+import difflib
+import itertools
+import queue
 import requests
 import random
 import string
 import json
 import logging
+import os
 import smtplib
+import threading
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
+
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Configuration Odoo
 ODOO_URL = "http://localhost:8069"
@@ -25,6 +36,14 @@ ODOO_DB = "odoo_db"
 ODOO_USERNAME = "admin"
 ODOO_PASSWORD = "admin"  # Mot de passe par défaut Odoo
 
+# Transport JSON-RPC vers Odoo
+RPC_CONNECT_TIMEOUT = 5.0  # Délai (secondes) d'établissement de la connexion
+RPC_READ_TIMEOUT = 60.0  # Délai (secondes) d'attente de la réponse d'Odoo
+RPC_RETRIES = 3  # Nouvelles tentatives si la connexion échoue (et si Odoo répond 502/503 à une lecture)
+RPC_POOL_SIZE = 32  # Connexions keep-alive conservées (au moins le nombre de workers d'import)
+RPC_BATCH_MODE = "auto"  # Tableaux JSON-RPC 2.0: "auto" (détection au premier lot), "on", "off"
+RPC_BATCH_PARALLEL = 8  # Appels simultanés quand le serveur n'accepte pas les tableaux
+
 # Configuration Email (à adapter selon votre serveur SMTP)
 SMTP_SERVER = "smtp.gmail.com"
 SMTP_PORT = 587
@@ -34,12 +53,439 @@ SMTP_PASSWORD = "your-password"
 # Configuration du logging
 LOG_FILE = "odoo_provisioning.log"
 
+# Import concurrent
+IMPORT_WORKERS = 1  # Lignes traitées en parallèle (1: import séquentiel)
+IMPORT_QUEUE_SIZE = 100  # Lignes lues d'avance au plus, en attente d'un worker
+IMPORT_BATCH_SIZE = 1  # Lignes dont les appels Odoo sont regroupés (1: une ligne à la fois)
+GROUP_FUZZY_CUTOFF = 0.85  # Similarité minimale (0 à 1) d'un nom de rôle approché
+IMPORT_MULTI_CREATE = True  # Un seul create res.users par paquet de lignes (voir create_users)
+IMPORT_CHECKPOINT_SUFFIX = ".checkpoint"  # Journal de reprise écrit à côté du fichier CSV
+
+# Méthodes execute_kw sans effet dans Odoo, rejouées sans risque après un 502/503
+READ_ONLY_METHODS = frozenset({"read", "search", "search_read", "search_count", "fields_get",
+                               "name_search", "default_get"})
+
+logger = logging.getLogger(__name__)
+
+
+class OdooRpcError(Exception):
+    """Erreur renvoyée par Odoo dans une réponse JSON-RPC"""
+
+    def __init__(self, error: Dict[str, Any]):
+        data = error.get("data") or {}
+        super().__init__(data.get("message") or error.get("message") or str(error))
+        self.error = error
+
+
+def odoo_unreachable(outcome: Any) -> bool:
+    """
+    Indique si un appel a échoué sans réponse d'Odoo (connexion impossible
+    ou coupée, délai dépassé): la ligne concernée est à retenter
+    """
+    return isinstance(outcome, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+
+class OdooTransport:
+    """
+    Transport JSON-RPC partagé par toutes les méthodes de l'import.
+
+    Une seule session HTTP garde les connexions ouvertes (keep-alive) et les
+    réutilise d'un appel à l'autre, y compris entre les threads d'import.
+    Chaque appel a un délai maximum. Les nouvelles tentatives ne concernent
+    que les connexions refusées (requête jamais envoyée) et, pour les seules
+    lectures, les réponses 502/503 d'un proxy ou d'un Odoo surchargé: un 502
+    peut arriver après qu'Odoo a traité une création, qui ne doit jamais
+    être rejouée.
+
+    call_many() regroupe des appels indépendants dans un seul échange HTTP
+    (tableau JSON-RPC 2.0, un id distinct par appel). Odoo n'accepte pas
+    ces tableaux: le premier lot refusé par une erreur JSON-RPC fait basculer
+    le transport sur des appels individuels en parallèle, sans changement
+    pour l'appelant; une erreur HTTP passagère ne change pas de mode.
+    """
+
+    def __init__(self, url: Optional[str] = None,
+                 timeout: Tuple[float, float] = (RPC_CONNECT_TIMEOUT, RPC_READ_TIMEOUT),
+                 retries: int = RPC_RETRIES, pool_size: int = RPC_POOL_SIZE,
+                 batch_mode: str = RPC_BATCH_MODE, batch_parallel: int = RPC_BATCH_PARALLEL):
+        self.url = f"{url or ODOO_URL}/jsonrpc"
+        self.timeout = timeout
+        self.batch_supported: Optional[bool] = {"on": True, "off": False}.get(batch_mode)
+        self._executor = ThreadPoolExecutor(max_workers=batch_parallel, thread_name_prefix="odoo-rpc")
+        self._ids = itertools.count(1)
+        self.session = self._session(pool_size, Retry(
+            total=retries, connect=retries, read=0, status=0, allowed_methods=frozenset({"POST"}),
+            backoff_factor=0.5, raise_on_status=False))
+        self.read_session = self._session(pool_size, Retry(
+            total=retries, connect=retries, read=0, status=retries,
+            status_forcelist=(502, 503), allowed_methods=frozenset({"POST"}),
+            backoff_factor=0.5, raise_on_status=False))
+
+    @staticmethod
+    def _session(pool_size: int, retry: Retry) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def _session_for(self, calls: List[Tuple[str, str, List[Any]]]) -> requests.Session:
+        """Session qui rejoue aussi les réponses 502/503, si tous les appels sont des lectures"""
+        if all(service == "common" or (method == "execute_kw" and args[4] in READ_ONLY_METHODS)
+               for service, method, args in calls):
+            return self.read_session
+        return self.session
+
+    def _payload(self, service: str, method: str, args: List[Any]) -> Dict[str, Any]:
+        return {
+            "jsonrpc": "2.0",
+            "method": "call",
+            "params": {"service": service, "method": method, "args": list(args)},
+            "id": next(self._ids)
+        }
+
+    def call(self, service: str, method: str, *args) -> Any:
+        """Appelle une méthode d'un service Odoo (common, object) et retourne son résultat"""
+        response = self._session_for([(service, method, args)]).post(
+            self.url, json=self._payload(service, method, args), timeout=self.timeout)
+        response.raise_for_status()
+        result = response.json()
+        if result.get("error"):
+            raise OdooRpcError(result["error"])
+        return result.get("result")
+
+    def call_many(self, calls: List[Tuple[str, str, List[Any]]]) -> List[Any]:
+        """
+        Exécute des appels (service, méthode, arguments) indépendants et retourne
+        leurs résultats dans le même ordre; un appel en échec est représenté par
+        son exception, sans affecter les autres
+        """
+        if len(calls) == 1:
+            return [self._call_safely(*calls[0])]
+        if self.batch_supported is not False:
+            results = self._post_batch(calls)
+            if results is not None:
+                return results
+        return list(self._executor.map(lambda call: self._call_safely(*call), calls))
+
+    def _call_safely(self, service: str, method: str, args: List[Any]) -> Any:
+        try:
+            return self.call(service, method, *args)
+        except Exception as e:
+            return e
+
+    def _post_batch(self, calls: List[Tuple[str, str, List[Any]]]) -> Optional[List[Any]]:
+        """Envoie un tableau JSON-RPC; None si le serveur ne gère pas les tableaux"""
+        payloads = [self._payload(service, method, args) for service, method, args in calls]
+        try:
+            response = self._session_for(calls).post(self.url, json=payloads, timeout=self.timeout)
+            body = response.json() if response.ok else None
+        except ValueError:
+            body = None
+        except requests.exceptions.RequestException as e:
+            return [e] * len(calls)
+
+        if (not self.batch_supported and isinstance(body, dict)
+                and body.get("error") and body.get("id") is None):
+            # Tableau refusé en entier par une erreur JSON-RPC (aucun appel exécuté):
+            # appels individuels désormais. Plusieurs threads peuvent envoyer leur
+            # premier lot avant la bascule.
+            if self.batch_supported is None:
+                logger.info("Le serveur n'accepte pas les lots JSON-RPC, appels individuels en parallèle")
+            self.batch_supported = False
+            return None
+        if not isinstance(body, list):
+            # Erreur HTTP passagère ou réponse illisible: le lot a pu être exécuté et
+            # n'est pas renvoyé; le mode lot reste inchangé pour les lots suivants
+            error = OdooRpcError({"message": f"Réponse invalide au lot JSON-RPC (HTTP {response.status_code})"})
+            return [error] * len(calls)
+
+        self.batch_supported = True
+        responses = {item.get("id"): item for item in body if isinstance(item, dict)}
+        results = []
+        for payload in payloads:
+            item = responses.get(payload["id"])
+            if item is None:
+                results.append(OdooRpcError({"message": "Réponse absente du lot JSON-RPC"}))
+            elif item.get("error"):
+                results.append(OdooRpcError(item["error"]))
+            else:
+                results.append(item.get("result"))
+        return results
+
+    @staticmethod
+    def _execute_args(uid: int, model: str, method: str, args: List[Any],
+                      kwargs: Optional[Dict[str, Any]] = None) -> List[Any]:
+        call_args = [ODOO_DB, uid, ODOO_PASSWORD, model, method, args]
+        if kwargs:
+            call_args.append(kwargs)
+        return call_args
+
+    def execute_kw(self, uid: int, model: str, method: str, args: List[Any],
+                   kwargs: Optional[Dict[str, Any]] = None) -> Any:
+        return self.call("object", "execute_kw", *self._execute_args(uid, model, method, args, kwargs))
+
+    def execute_many(self, uid: int, calls: List[Tuple]) -> List[Any]:
+        """call_many() pour des appels (modèle, méthode, arguments[, kwargs]) sur le service object"""
+        return self.call_many([("object", "execute_kw", self._execute_args(uid, *call)) for call in calls])
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self.session.close()
+        self.read_session.close()
+
+
+def normalize_group_name(name: str) -> str:
+    """Forme de comparaison d'un nom de groupe: sans accents, casse ni espaces superflus"""
+    decomposed = unicodedata.normalize("NFKD", name or "")
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(stripped.casefold().split())
+
+
+class GroupNameIndex:
+    """
+    Catalogue des groupes Odoo chargé une fois par import, pour résoudre les
+    rôles du CSV sans appel RPC par ligne.
+
+    Un nom est cherché, après normalisation (accents, casse, espaces), parmi
+    les noms et noms complets ("Catégorie / Nom") des groupes: égalité,
+    puis inclusion désignant un seul groupe (comme l'ancien 'ilike'), puis
+    nom approché (difflib) au-delà de `cutoff`. Les noms non résolus et les
+    correspondances approchées sont conservés pour le bilan de l'import.
+    """
+
+    def __init__(self, groups: List[Dict[str, Any]], cutoff: float = GROUP_FUZZY_CUTOFF):
+        self.cutoff = cutoff
+        self.names: Dict[str, set] = {}
+        self.labels: Dict[int, str] = {}
+        for group in groups:
+            self.labels[group['id']] = group['name']
+            names = [group['name']]
+            if group.get('category_id'):
+                names.append(f"{group['category_id'][1]} / {group['name']}")
+            for name in names:
+                self.names.setdefault(normalize_group_name(name), set()).add(group['id'])
+        self.unresolved: Dict[str, int] = {}
+        self.approximate: Dict[str, str] = {}
+        self._resolved: Dict[str, Optional[int]] = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, name: str) -> Optional[int]:
+        """ID du groupe désigné par `name`, ou None (nom inconnu ou ambigu)"""
+        with self._lock:
+            if name not in self._resolved:
+                self._resolved[name] = self._lookup(name)
+            group_id = self._resolved[name]
+            if group_id is None:
+                self.unresolved[name] = self.unresolved.get(name, 0) + 1
+            return group_id
+
+    def _lookup(self, name: str) -> Optional[int]:
+        key = normalize_group_name(name)
+        ids = self.names.get(key)
+        if ids:
+            return min(ids) if len(ids) == 1 else None
+        ids = set().union(*(ids for candidate, ids in self.names.items() if key and key in candidate))
+        if len(ids) == 1:
+            return next(iter(ids))
+        if ids:
+            return None
+        matches = difflib.get_close_matches(key, list(self.names), n=2, cutoff=self.cutoff)
+        if matches and len(self.names[matches[0]]) == 1:
+            group_id = next(iter(self.names[matches[0]]))
+            self.approximate[name] = self.labels[group_id]
+            return group_id
+        return None
+
+    def report(self) -> Dict[str, Any]:
+        return {"unresolved": dict(self.unresolved), "approximate": dict(self.approximate)}
+
+
+class ImportCheckpoint:
+    """
+    Journal de reprise d'un import CSV (une entrée JSON par ligne).
+
+    La première entrée identifie le fichier importé (chemin, taille, date de
+    modification); chaque entrée suivante est ajoutée, puis écrite sur disque
+    (fsync), dès qu'un paquet de lignes est terminé, même si des lignes
+    précédentes sont encore en cours (import parallèle): pour chaque ligne du
+    paquet, son numéro, l'ID créé (null en cas d'échec) et la position en
+    octets après la ligne. Le journal ne fait que grandir: son écriture
+    reste proportionnelle au paquet, quelle que soit la taille de l'import.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    @staticmethod
+    def source(file_path: str) -> Dict[str, Any]:
+        stat = os.stat(file_path)
+        return {"file": os.path.abspath(file_path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """
+        Relit le journal et retourne l'état cumulé (None s'il n'existe pas),
+        dont les résultats des lignes terminées (voir ImportResults).
+        La lecture s'arrête à une entrée incomplète (arrêt pendant l'écriture)
+        ou d'un format inconnu: la suite du journal est ignorée.
+        """
+        try:
+            with open(self.path, "rb") as f:
+                content = f.read()
+        except FileNotFoundError:
+            return None
+        state: Dict[str, Any] = {"source": None, "results": [], "completed": False, "valid_size": 0}
+        position = 0
+        for raw in content.splitlines(keepends=True):
+            try:
+                entry = json.loads(raw)
+            except ValueError:
+                break
+            if not raw.endswith(b"\n"):
+                break
+            if state["source"] is None:
+                state["source"] = entry
+            elif entry.get("completed"):
+                state["completed"] = True
+            elif "results" in entry:
+                state["results"].extend(tuple(result) for result in entry["results"])
+            else:
+                break
+            position += len(raw)
+            state["valid_size"] = position
+        if state["source"] is None:
+            return None
+        return state
+
+    def start(self, source: Dict[str, Any]):
+        """Commence un nouveau journal (remplace le précédent)"""
+        self._file = open(self.path, "wb")
+        self._write(source)
+
+    def resume(self, state: Dict[str, Any]):
+        """Reprend le journal chargé par load(), sans son éventuelle entrée incomplète"""
+        self._file = open(self.path, "r+b")
+        self._file.truncate(state["valid_size"])
+        self._file.seek(state["valid_size"])
+
+    def append(self, results: List[Tuple[int, Optional[int], int]]):
+        """Enregistre les résultats (ligne, user_id, position après la ligne) d'un paquet terminé"""
+        self._write({"results": results})
+
+    def complete(self):
+        self._write({"completed": True})
+
+    def _write(self, entry: Dict[str, Any]):
+        self._file.write(json.dumps(entry).encode("utf-8") + b"\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class _OffsetLines:
+    """Lignes d'un fichier ouvert en binaire, avec la position atteinte en octets"""
+
+    def __init__(self, f, encoding: str = "utf-8"):
+        self.f = f
+        self.encoding = encoding
+        self.offset = f.tell()
+
+    def seek(self, offset: int):
+        self.f.seek(offset)
+        self.offset = offset
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        line = self.f.readline()
+        if not line:
+            raise StopIteration
+        self.offset += len(line)
+        return line.decode(self.encoding)
+
+
+class ImportResults:
+    """
+    Résultats d'un import CSV, agrégés dans l'ordre des lignes du fichier
+    même lorsque les lignes sont traitées en parallèle.
+
+    Avec un journal de reprise, les résultats de chaque paquet terminé y
+    sont enregistrés (voir ImportCheckpoint); à la reprise, les lignes déjà
+    terminées après le préfixe de lignes consécutives ne sont pas renvoyées.
+    Les lignes en échec faute de réponse d'Odoo (`unfinished_lines`) comptent
+    parmi les échecs mais ne sont pas journalisées: une reprise les retente.
+    """
+
+    def __init__(self, checkpoint: Optional[ImportCheckpoint] = None, state: Optional[Dict[str, Any]] = None):
+        self.total = 0  # Lignes consécutives terminées depuis le début du fichier
+        self.offset = 0  # Position en octets après la ligne `total`
+        self.successful = 0
+        self.failed_lines: List[int] = []
+        self.created_ids: List[int] = []
+        self.unfinished_lines: List[int] = []
+        self.checkpoint = checkpoint
+        self._pending: Dict[int, Tuple[Optional[int], int]] = {}  # Lignes terminées après `total`
+        self._lock = threading.Lock()
+        for line, user_id, offset in (state or {}).get("results", []):
+            self._pending[line] = (user_id, offset)
+        self._advance()
+
+    def is_done(self, line: int) -> bool:
+        """Indique si la ligne `line` est déjà terminée (reprise d'un import)"""
+        with self._lock:
+            return line <= self.total or line in self._pending
+
+    def record(self, line: int, user_id: Optional[int], offset: int = 0):
+        """
+        Enregistre le résultat de la ligne `line` (numérotée à partir de 1):
+        l'ID de l'utilisateur créé, ou None en cas d'échec
+        """
+        self.record_many([(line, user_id, offset)])
+
+    def record_many(self, entries: List[Tuple[int, Optional[int], int]], unfinished: List[int] = ()):
+        """
+        Enregistre les résultats (ligne, user_id, position après la ligne) d'un
+        paquet; les lignes `unfinished` sont en échec sans être journalisées
+        """
+        with self._lock:
+            for line, user_id, offset in entries:
+                self._pending[line] = (user_id, offset)
+            self.unfinished_lines.extend(unfinished)
+            finished = [entry for entry in entries if entry[0] not in unfinished]
+            if self.checkpoint is not None and finished:
+                self.checkpoint.append(finished)
+            self._advance()
+
+    def _advance(self):
+        """Avance le préfixe de lignes consécutives terminées"""
+        while self.total + 1 in self._pending:
+            self.total += 1
+            user_id, self.offset = self._pending.pop(self.total)
+            if user_id:
+                self.successful += 1
+                self.created_ids.append(user_id)
+            else:
+                self.failed_lines.append(self.total)
+
+    def summary(self) -> Dict[str, Any]:
+        return {"total": self.total, "successful": self.successful, "failed_lines": self.failed_lines,
+                "unfinished_lines": sorted(self.unfinished_lines)}
+
+
 class OdooUserProvisioning:
     """Classe principale pour le provisionnement des utilisateurs Odoo"""
     
-    def __init__(self):
+    def __init__(self, transport: Optional[OdooTransport] = None):
         self.setup_logging()
         self.uid = None
+        self.transport = transport or OdooTransport()
+        self.default_group_ids: Optional[List[int]] = None  # Voir load_default_groups
         
     def setup_logging(self):
         """Configuration du système de logging"""
@@ -74,36 +520,26 @@ class OdooUserProvisioning:
         Authentifie l'utilisateur et retourne l'UID de session
         """
         try:
-            url = f"{ODOO_URL}/jsonrpc"
-            headers = {'Content-Type': 'application/json'}
-            auth_data = {
-                "jsonrpc": "2.0",
-                "method": "call",
-                "params": {
-                    "service": "common",
-                    "method": "authenticate",
-                    "args": [ODOO_DB, ODOO_USERNAME, ODOO_PASSWORD, {}]
-                },
-                "id": 1
-            }
-            
-            response = requests.post(url, json=auth_data, headers=headers)
-            response.raise_for_status()
-            result = response.json()
+            uid = self.transport.call("common", "authenticate",
+                                      ODOO_DB, ODOO_USERNAME, ODOO_PASSWORD, {})
             
-            if result.get("result"):
-                self.uid = result["result"]
+            if uid:
+                self.uid = uid
                 self.log_operation("authenticate", 
                                  {"db": ODOO_DB, "user": ODOO_USERNAME}, 
                                  f"UID: {self.uid}", True)
                 return self.uid
             else:
-                error_msg = result.get("error", "Authentification échouée")
                 self.log_operation("authenticate", 
                                  {"db": ODOO_DB, "user": ODOO_USERNAME}, 
-                                 error_msg, False)
+                                 "Authentification échouée", False)
                 return None
                 
+        except OdooRpcError as e:
+            self.log_operation("authenticate", 
+                             {"db": ODOO_DB, "user": ODOO_USERNAME}, 
+                             str(e), False)
+            return None
         except requests.exceptions.RequestException as e:
             self.log_operation("authenticate", 
                              {"db": ODOO_DB, "user": ODOO_USERNAME}, 
@@ -141,78 +577,122 @@ class OdooUserProvisioning:
         Crée un nouvel utilisateur dans Odoo avec mot de passe généré
         """
         try:
-            # Génération du mot de passe
-            password = self.generate_password()
-            user['password'] = password
-            
-            url = f"{ODOO_URL}/jsonrpc"
-            headers = {'Content-Type': 'application/json'}
-            create_user_data = {
-                "jsonrpc": "2.0",
-                "method": "call",
-                "params": {
-                    "service": "object",
-                    "method": "execute_kw",
-                    "args": [ODOO_DB, uid, ODOO_PASSWORD, "res.users", "create", [{
-                        "name": f"{user['prenom']} {user['nom']}",
-                        "login": user['email'],
-                        "email": user['email'],
-                        "password": password,
-                        "active": True,
-                        "street": user.get('adresse', ''),
-                        "employee_id": user.get('numero_utilisateur')
-                    }]]
-                },
-                "id": 2
-            }
-            
-            response = requests.post(url, json=create_user_data, headers=headers)
-            response.raise_for_status()
-            result = response.json()
-            
-            if result.get("result"):
-                user_id = result["result"]
-                user_data = {k: v for k, v in user.items() if k != 'password'}  # Ne pas logger le mot de passe
-                self.log_operation("create_user", user_data, f"User ID: {user_id}", True)
-                
-                # Envoyer email avec les identifiants
-                self.send_welcome_email(user, password)
-                
-                return user_id
-            else:
-                error_msg = result.get("error", "Création utilisateur échouée")
-                self.log_operation("create_user", user, error_msg, False)
-                return None
-                
+            user_id = self.transport.execute_kw(uid, "res.users", "create", [self.build_user_values(user)])
         except Exception as e:
-            self.log_operation("create_user", user, f"Erreur: {str(e)}", False)
+            user_id = e
+        return self._user_created(user, user_id)
+    
+    def create_users(self, uid: int, users: List[Dict[str, str]],
+                     values: Optional[List[Dict[str, Any]]] = None,
+                     multi_create: bool = IMPORT_MULTI_CREATE) -> List[Optional[int]]:
+        """
+        Crée plusieurs utilisateurs à partir de leurs valeurs res.users
+        (build_user_values par défaut).
+        
+        Avec multi_create, un seul create reçoit toutes les valeurs: un appel
+        Odoo pour tout le paquet. Ce create est atomique; s'il est refusé
+        (login en double, valeur invalide), les créations sont renvoyées une
+        par une (voir OdooTransport.call_many) et chacune réussit ou échoue
+        séparément.
+        """
+        if values is None:
+            values = [self.build_user_values(user) for user in users]
+        return [self._user_created(user, outcome)
+                for user, outcome in zip(users, self._create_many(uid, values, multi_create))]
+    
+    def _create_many(self, uid: int, values: List[Dict[str, Any]], multi_create: bool) -> List[Any]:
+        """Résultats bruts des créations: ID créé, ou exception en cas d'échec"""
+        outcomes: Optional[List[Any]] = None
+        if multi_create and len(values) > 1:
+            try:
+                user_ids = self.transport.execute_kw(uid, "res.users", "create", [values])
+                if isinstance(user_ids, list) and len(user_ids) == len(values):
+                    outcomes = user_ids
+            except OdooRpcError as e:
+                self.logger.info(f"Création groupée de {len(values)} utilisateurs refusée, "
+                                 f"création une par une: {str(e)}")
+            except Exception as e:
+                # Résultat inconnu (coupure réseau): ne pas risquer de créer deux fois
+                outcomes = [e] * len(values)
+        if outcomes is None:
+            outcomes = self.transport.execute_many(
+                uid, [("res.users", "create", [user_values]) for user_values in values]
+            )
+        return outcomes
+    
+    def build_user_values(self, user: Dict[str, str], group_id: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Valeurs res.users d'une ligne CSV, avec un mot de passe généré et,
+        si group_id est fourni et les groupes par défaut connus (voir
+        load_default_groups), le lien vers le groupe du rôle
+        """
+        # Génération du mot de passe
+        password = self.generate_password()
+        user['password'] = password
+        
+        values = {
+            "name": f"{user['prenom']} {user['nom']}",
+            "login": user['email'],
+            "email": user['email'],
+            "password": password,
+            "active": True,
+            "street": user.get('adresse', ''),
+            "employee_id": user.get('numero_utilisateur')
+        }
+        if group_id and self.default_group_ids is not None:
+            # Un groups_id dans le create remplace les groupes par défaut d'Odoo:
+            # ils sont repris explicitement avec le groupe du rôle
+            group_ids = dict.fromkeys(self.default_group_ids + [group_id])
+            values["groups_id"] = [(4, default_group_id) for default_group_id in group_ids]
+        return values
+    
+    def compile_rows(self, uid: int, rows: List[Dict[str, str]],
+                     group_index: Optional[GroupNameIndex] = None
+                     ) -> Tuple[List[Dict[str, Any]], List[Optional[int]]]:
+        """
+        Prépare la création de lignes CSV: retourne, pour chaque ligne, les
+        valeurs res.users complètes (profil et groupe du rôle) et l'ID du
+        groupe attribué (None sans rôle ou si le rôle est introuvable).
+        Avec `group_index`, les rôles sont résolus sans appel à Odoo, sinon
+        par un appel get_group_id par rôle distinct.
+        """
+        roles = [row['droits'] for row in rows if row.get('droits')]
+        if group_index is not None:
+            group_ids = {role: group_index.resolve(role) for role in roles}
+        else:
+            group_ids = {role: self.get_group_id(uid, role) for role in sorted(set(roles))}
+        
+        row_groups = [group_ids[row['droits']] if row.get('droits') else None for row in rows]
+        values = [self.build_user_values(row, group_id) for row, group_id in zip(rows, row_groups)]
+        return values, row_groups
+    
+    def _user_created(self, user: Dict[str, str], outcome: Any) -> Optional[int]:
+        """Journalise le résultat d'une création et envoie l'email de bienvenue"""
+        if isinstance(outcome, Exception):
+            self.log_operation("create_user", user, f"Erreur: {str(outcome)}", False)
+            return None
+        if not outcome:
+            self.log_operation("create_user", user, "Création utilisateur échouée", False)
             return None
+        
+        user_data = {k: v for k, v in user.items() if k != 'password'}  # Ne pas logger le mot de passe
+        self.log_operation("create_user", user_data, f"User ID: {outcome}", True)
+        
+        # Envoyer email avec les identifiants
+        self.send_welcome_email(user, user['password'])
+        
+        return outcome
     
     def get_group_id(self, uid: int, group_name: str) -> Optional[int]:
         """
         I.4: Recherche de l'ID d'un groupe Odoo par son nom
         """
         try:
-            url = f"{ODOO_URL}/jsonrpc"
-            headers = {'Content-Type': 'application/json'}
-            search_data = {
-                "jsonrpc": "2.0",
-                "method": "call",
-                "params": {
-                    "service": "object",
-                    "method": "execute_kw",
-                    "args": [ODOO_DB, uid, ODOO_PASSWORD, "res.groups", "search", 
-                            [[("name", "ilike", group_name)]]]
-                },
-                "id": 3
-            }
-            
-            response = requests.post(url, json=search_data, headers=headers)
-            response.raise_for_status()
-            result = response.json()
+            group_ids = self.transport.execute_kw(uid, "res.groups", "search",
+                                                  [[("name", "ilike", group_name)]])
             
-            if result.get("result") and len(result["result"]) > 0:
-                group_id = result["result"][0]
+            if group_ids:
+                group_id = group_ids[0]
                 self.log_operation("get_group_id", 
                                  {"group_name": group_name}, 
                                  f"Group ID: {group_id}", True)
@@ -229,47 +709,67 @@ class OdooUserProvisioning:
                              f"Erreur: {str(e)}", False)
             return None
     
+    def load_group_index(self, uid: int) -> Optional[GroupNameIndex]:
+        """Charge le catalogue des groupes en un seul appel (None en cas d'échec)"""
+        try:
+            groups = self.transport.execute_kw(uid, "res.groups", "search_read",
+                                               [[]], {"fields": ["name", "category_id"]})
+        except Exception as e:
+            self.logger.warning(f"Catalogue des groupes indisponible, recherche par rôle: {str(e)}")
+            return None
+        self.logger.info(f"Catalogue des groupes chargé ({len(groups)} groupes)")
+        return GroupNameIndex(groups)
+    
+    def load_default_groups(self, uid: int) -> Optional[List[int]]:
+        """
+        Charge les groupes qu'Odoo donne à un nouvel utilisateur (modèle
+        base.default_user), à reprendre dans un create qui fixe groups_id
+        (None en cas d'échec)
+        """
+        try:
+            defaults = self.transport.execute_kw(uid, "res.users", "default_get", [["groups_id"]])
+        except Exception as e:
+            self.logger.warning(f"Groupes par défaut indisponibles, rôles attribués après création: {str(e)}")
+            return None
+        group_ids: List[int] = []
+        for item in defaults.get("groups_id") or []:
+            if isinstance(item, int):
+                group_ids.append(item)
+            elif item[0] == 6:
+                group_ids.extend(item[2])
+            elif item[0] == 4:
+                group_ids.append(item[1])
+        self.default_group_ids = group_ids
+        return group_ids
+    
     def assign_permissions(self, uid: int, user_id: int, group_id: int) -> bool:
         """
         I.4: Attribution des droits à un utilisateur
         Assigne un utilisateur à un groupe (rôle)
         """
-        try:
-            url = f"{ODOO_URL}/jsonrpc"
-            headers = {'Content-Type': 'application/json'}
-            assign_data = {
-                "jsonrpc": "2.0",
-                "method": "call",
-                "params": {
-                    "service": "object",
-                    "method": "execute_kw",
-                    "args": [ODOO_DB, uid, ODOO_PASSWORD, "res.users", "write", 
-                            [[user_id], {"groups_id": [(4, group_id)]}]]
-                },
-                "id": 4
-            }
-            
-            response = requests.post(url, json=assign_data, headers=headers)
-            response.raise_for_status()
-            result = response.json()
-            
-            if result.get("result"):
-                self.log_operation("assign_permissions", 
-                                 {"user_id": user_id, "group_id": group_id}, 
-                                 "Permissions assignées avec succès", True)
-                return True
+        return self.assign_permissions_many(uid, [(user_id, group_id)])[0]
+    
+    def assign_permissions_many(self, uid: int, assignments: List[Tuple[int, int]]) -> List[bool]:
+        """Attributions (user_id, group_id) indépendantes, en un seul échange avec Odoo"""
+        outcomes = self.transport.execute_many(
+            uid, [("res.users", "write", [[user_id], {"groups_id": [(4, group_id)]}])
+                  for user_id, group_id in assignments]
+        )
+        results = []
+        for (user_id, group_id), outcome in zip(assignments, outcomes):
+            operation_data = {"user_id": user_id, "group_id": group_id}
+            if isinstance(outcome, Exception):
+                self.log_operation("assign_permissions", operation_data, f"Erreur: {str(outcome)}", False)
+                results.append(False)
+            elif outcome:
+                self.log_operation("assign_permissions", operation_data,
+                                   "Permissions assignées avec succès", True)
+                results.append(True)
             else:
-                error_msg = result.get("error", "Échec de l'assignation des permissions")
-                self.log_operation("assign_permissions", 
-                                 {"user_id": user_id, "group_id": group_id}, 
-                                 error_msg, False)
-                return False
-                
-        except Exception as e:
-            self.log_operation("assign_permissions", 
-                             {"user_id": user_id, "group_id": group_id}, 
-                             f"Erreur: {str(e)}", False)
-            return False
+                self.log_operation("assign_permissions", operation_data,
+                                   "Échec de l'assignation des permissions", False)
+                results.append(False)
+        return results
     
     def send_welcome_email(self, user: Dict[str, str], password: str):
         """
@@ -312,10 +812,132 @@ class OdooUserProvisioning:
         except Exception as e:
             self.logger.error(f"Erreur lors de l'envoi de l'email à {user['email']}: {str(e)}")
     
-    def import_accounts_from_csv(self, file_path: str):
+    def process_row(self, uid: int, row: Dict[str, str]) -> bool:
+        """
+        Crée l'utilisateur d'une ligne CSV et lui attribue son rôle.
+        Retourne True si l'utilisateur a été créé (même sans son rôle introuvable)
+        """
+        return bool(self.process_rows(uid, [row])[0])
+    
+    def process_rows(self, uid: int, rows: List[Dict[str, str]],
+                     group_index: Optional[GroupNameIndex] = None) -> List[Optional[int]]:
+        """
+        process_row() pour plusieurs lignes: chaque ligne est compilée en une
+        seule création res.users incluant son rôle (voir compile_rows), et les
+        créations sont envoyées à Odoo ensemble (voir create_users). Sans
+        groupes par défaut connus, les rôles sont attribués après la création.
+        Retourne l'ID de l'utilisateur créé de chaque ligne (None en cas d'échec,
+        y compris si son rôle n'a pas pu lui être attribué).
+        """
+        return [None if isinstance(result, Exception) else result
+                for result in self._process_rows(uid, rows, group_index)]
+    
+    def _process_rows(self, uid: int, rows: List[Dict[str, str]],
+                      group_index: Optional[GroupNameIndex] = None) -> List[Any]:
+        """process_rows(), où une création sans réponse d'Odoo est représentée par son exception"""
+        for row in rows:
+            self.logger.info(f"Traitement de l'utilisateur: {row['prenom']} {row['nom']}")
+        
+        values, group_ids = self.compile_rows(uid, rows, group_index)
+        created = self._create_many(uid, values, IMPORT_MULTI_CREATE)
+        user_ids = [self._user_created(row, outcome) for row, outcome in zip(rows, created)]
+        assigned = [True] * len(rows)
+        if self.default_group_ids is None:
+            # Groupes par défaut inconnus: le rôle est attribué après la création
+            pending = [index for index, (user_id, group_id) in enumerate(zip(user_ids, group_ids))
+                       if user_id and group_id]
+            if pending:
+                outcomes = self.assign_permissions_many(
+                    uid, [(user_ids[index], group_ids[index]) for index in pending])
+                for index, outcome in zip(pending, outcomes):
+                    assigned[index] = outcome
+        
+        results: List[Any] = []
+        for row, outcome, user_id, group_id, role_assigned in zip(rows, created, user_ids, group_ids, assigned):
+            if not user_id:
+                self.logger.error(f"Échec de la création de l'utilisateur {row['prenom']} {row['nom']}")
+                results.append(outcome if odoo_unreachable(outcome) else None)
+                continue
+            self.logger.info(f"Utilisateur créé avec ID: {user_id}")
+            
+            if not row.get('droits'):
+                self.logger.info(f"Aucun rôle défini pour {row['prenom']} {row['nom']}")
+            elif not group_id:
+                self.logger.warning(f"Groupe {row['droits']} introuvable pour {row['prenom']} {row['nom']}")
+                # Utilisateur créé mais sans rôle
+            elif not role_assigned:
+                self.logger.error(f"Échec de l'assignation du rôle pour {row['prenom']} {row['nom']}")
+                results.append(None)
+                continue
+            else:
+                self.logger.info(f"Utilisateur {row['prenom']} {row['nom']} créé avec le rôle {row['droits']}")
+            results.append(user_id)
+        return results
+    
+    def _process_chunk(self, uid: int, chunk: List[Tuple[int, Dict[str, str], int]], results: ImportResults,
+                       group_index: Optional[GroupNameIndex] = None):
+        try:
+            outcomes = self._process_rows(uid, [row for _, row, _ in chunk], group_index)
+        except Exception as e:
+            self.logger.error(f"Erreur lors du traitement des lignes {chunk[0][0]} à {chunk[-1][0]}: {str(e)}")
+            outcomes = [e if odoo_unreachable(e) else None] * len(chunk)
+        # Les lignes restées sans réponse d'Odoo ne sont pas journalisées: une reprise les retente
+        results.record_many([(line, None if isinstance(outcome, Exception) else outcome, offset)
+                             for (line, _, offset), outcome in zip(chunk, outcomes)],
+                            unfinished=[line for (line, _, _), outcome in zip(chunk, outcomes)
+                                        if isinstance(outcome, Exception)])
+    
+    @staticmethod
+    def _read_rows(csvfile, start_line: int = 0, start_offset: int = 0):
+        """
+        Lit les lignes (numéro, ligne, position en octets après la ligne) d'un
+        fichier CSV ouvert en binaire. Avec start_offset, la lecture reprend
+        directement à cette position, après la ligne numéro start_line.
+        """
+        lines = _OffsetLines(csvfile)
+        try:
+            fieldnames = next(csv.reader(lines))
+        except StopIteration:
+            return
+        if start_offset:
+            lines.seek(start_offset)
+        reader = csv.DictReader(lines, fieldnames=fieldnames)
+        for line, row in enumerate(reader, start=start_line + 1):
+            yield line, row, lines.offset
+    
+    @staticmethod
+    def _read_chunks(rows, batch_size: int):
+        """Regroupe les lignes (numéro, ligne, position) du fichier par paquets de batch_size"""
+        while True:
+            chunk = list(itertools.islice(rows, max(1, batch_size)))
+            if not chunk:
+                return
+            yield chunk
+    
+    def import_accounts_from_csv(self, file_path: str, workers: int = IMPORT_WORKERS,
+                                 queue_size: int = IMPORT_QUEUE_SIZE,
+                                 batch_size: int = IMPORT_BATCH_SIZE, resume: bool = False,
+                                 checkpoint_path: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """
         I.4: Intégration des différentes fonctions pour implémenter le script d'import automatique
         Fonction principale qui importe tous les utilisateurs depuis un fichier CSV
+        
+        Avec workers > 1, les lignes sont lues au fil de l'eau dans une file
+        bornée (queue_size lignes d'avance au plus, le fichier n'est jamais
+        chargé en entier) et traitées par autant de threads. Avec
+        batch_size > 1, les appels Odoo de batch_size lignes consécutives sont
+        regroupés (voir process_rows). Le catalogue des groupes est chargé une
+        seule fois: les rôles sont résolus sans appel à Odoo par ligne, et
+        ceux qui ne correspondent à aucun groupe sont signalés dans le bilan.
+        
+        L'avancement est enregistré après chaque paquet terminé dans un
+        journal de reprise (checkpoint_path, par défaut le fichier CSV suivi
+        de IMPORT_CHECKPOINT_SUFFIX). Avec resume, l'import repart de la
+        position enregistrée sans relire ni renvoyer les lignes terminées;
+        le fichier CSV ne doit pas avoir été modifié entre-temps. Les lignes
+        restées sans réponse d'Odoo ne sont pas journalisées (le journal
+        reste inachevé): une reprise les retente.
+        Retourne le bilan de l'import, dans l'ordre des lignes du fichier.
         """
         self.logger.info(f"Début de l'import depuis {file_path}")
         
@@ -323,55 +945,107 @@ class OdooUserProvisioning:
         uid = self.authenticate()
         if not uid:
             self.logger.error("Échec de l'authentification à Odoo")
-            return
+            return None
         
         self.logger.info("Authentification réussie")
+        checkpoint = ImportCheckpoint(checkpoint_path or file_path + IMPORT_CHECKPOINT_SUFFIX)
         
         try:
+            source = ImportCheckpoint.source(file_path)
+            state = checkpoint.load()
+            if resume and state is not None:
+                if state["source"] != source:
+                    self.logger.error(f"Reprise impossible: {file_path} a été modifié depuis "
+                                      f"le point de reprise {checkpoint.path}")
+                    return None
+                if state["completed"]:
+                    self.logger.info(f"Import de {file_path} déjà terminé ({checkpoint.path})")
+                    return ImportResults(state=state).summary()
+                checkpoint.resume(state)
+            else:
+                if resume:
+                    self.logger.warning(f"Aucun point de reprise ({checkpoint.path}), import depuis le début")
+                elif state is not None and not state["completed"]:
+                    self.logger.warning(f"Point de reprise {checkpoint.path} d'un import inachevé remplacé")
+                state = None
+                checkpoint.start(source)
+            results = ImportResults(checkpoint, state)
+            if state is not None:
+                self.logger.info(f"Reprise de l'import après la ligne {results.total}")
+            group_index = self.load_group_index(uid)
+            self.load_default_groups(uid)
+            
             # Lecture du fichier CSV
-            with open(file_path, newline='', encoding='utf-8') as csvfile:
-                reader = csv.DictReader(csvfile)
-                total_users = 0
-                successful_users = 0
-                
-                for row in reader:
-                    total_users += 1
-                    self.logger.info(f"Traitement de l'utilisateur: {row['prenom']} {row['nom']}")
-                    
-                    # Création de l'utilisateur
-                    user_id = self.create_user(uid, row)
-                    if user_id:
-                        self.logger.info(f"Utilisateur créé avec ID: {user_id}")
-                        
-                        # Attribution des permissions si un rôle est défini
-                        if row.get('droits'):
-                            group_id = self.get_group_id(uid, row['droits'])
-                            if group_id:
-                                if self.assign_permissions(uid, user_id, group_id):
-                                    self.logger.info(f"Utilisateur {row['prenom']} {row['nom']} créé avec le rôle {row['droits']}")
-                                    successful_users += 1
-                                else:
-                                    self.logger.error(f"Échec de l'assignation du rôle pour {row['prenom']} {row['nom']}")
-                            else:
-                                self.logger.warning(f"Groupe {row['droits']} introuvable pour {row['prenom']} {row['nom']}")
-                                successful_users += 1  # Utilisateur créé mais sans rôle
-                        else:
-                            self.logger.info(f"Aucun rôle défini pour {row['prenom']} {row['nom']}")
-                            successful_users += 1
-                    else:
-                        self.logger.error(f"Échec de la création de l'utilisateur {row['prenom']} {row['nom']}")
-                
-                # Résumé de l'import
-                self.logger.info(f"Import terminé: {successful_users}/{total_users} utilisateurs créés avec succès")
-                self.log_operation("import_accounts_from_csv", 
-                                 {"file": file_path, "total": total_users}, 
-                                 f"Succès: {successful_users}/{total_users}", 
-                                 successful_users > 0)
+            with open(file_path, 'rb') as csvfile:
+                rows = self._read_rows(csvfile, results.total, results.offset)
+                # Lignes terminées au-delà du préfixe (import parallèle interrompu)
+                rows = (item for item in rows if not results.is_done(item[0]))
+                chunks = self._read_chunks(rows, batch_size)
+                if workers <= 1:
+                    for chunk in chunks:
+                        self._process_chunk(uid, chunk, results, group_index)
+                else:
+                    self._import_concurrently(uid, chunks, results, group_index, workers,
+                                              max(1, queue_size // max(1, batch_size)))
+            if results.unfinished_lines:
+                self.logger.warning(f"{len(results.unfinished_lines)} ligne(s) sans réponse d'Odoo, "
+                                    f"à retenter avec --resume ({checkpoint.path})")
+            else:
+                checkpoint.complete()
+            
+            # Résumé de l'import
+            total_users, successful_users = results.total, results.successful
+            self.logger.info(f"Import terminé: {successful_users}/{total_users} utilisateurs créés avec succès")
+            self.log_operation("import_accounts_from_csv", 
+                             {"file": file_path, "total": total_users}, 
+                             f"Succès: {successful_users}/{total_users}", 
+                             successful_users > 0)
+            summary = results.summary()
+            if group_index is not None:
+                summary["groups"] = self._report_groups(group_index)
+            return summary
                 
         except FileNotFoundError:
             self.logger.error(f"Fichier {file_path} non trouvé")
         except Exception as e:
             self.logger.error(f"Erreur lors de l'import: {str(e)}")
+        finally:
+            checkpoint.close()
+        return None
+    
+    def _report_groups(self, group_index: GroupNameIndex) -> Dict[str, Any]:
+        """Signale les rôles du fichier non résolus ou résolus de façon approchée"""
+        report = group_index.report()
+        for name, group_name in report["approximate"].items():
+            self.logger.warning(f"Rôle '{name}' associé au groupe approchant '{group_name}'")
+        for name, count in report["unresolved"].items():
+            self.logger.warning(f"Rôle '{name}' introuvable ou ambigu ({count} ligne(s) sans rôle)")
+        return report
+    
+    def _import_concurrently(self, uid: int, chunks, results: ImportResults,
+                             group_index: Optional[GroupNameIndex], workers: int, queue_size: int):
+        """Répartit les paquets de lignes entre `workers` threads via une file bornée"""
+        work: "queue.Queue[Optional[List[Tuple[int, Dict[str, str], int]]]]" = queue.Queue(maxsize=queue_size)
+        
+        def worker():
+            while True:
+                chunk = work.get()
+                if chunk is None:
+                    return
+                self._process_chunk(uid, chunk, results, group_index)
+        
+        threads = [threading.Thread(target=worker, name=f"import-{index}", daemon=True)
+                   for index in range(workers)]
+        for thread in threads:
+            thread.start()
+        try:
+            for chunk in chunks:
+                work.put(chunk)  # Bloque tant que les workers sont en retard
+        finally:
+            for _ in threads:
+                work.put(None)
+            for thread in threads:
+                thread.join()
     
     def list_existing_groups(self) -> List[Dict]:
         """
@@ -382,25 +1056,11 @@ class OdooUserProvisioning:
             return []
         
         try:
-            url = f"{ODOO_URL}/jsonrpc"
-            headers = {'Content-Type': 'application/json'}
-            search_data = {
-                "jsonrpc": "2.0",
-                "method": "call",
-                "params": {
-                    "service": "object",
-                    "method": "execute_kw",
-                    "args": [ODOO_DB, uid, ODOO_PASSWORD, "res.groups", "search_read", 
-                            [[]], {"fields": ["name", "category_id"]}]
-                },
-                "id": 5
-            }
+            groups = self.transport.execute_kw(uid, "res.groups", "search_read",
+                                               [[]], {"fields": ["name", "category_id"]})
             
-            response = requests.post(url, json=search_data, headers=headers)
-            result = response.json()
-            
-            if result.get("result"):
-                return result["result"]
+            if groups:
+                return groups
             else:
                 return []
                 
@@ -411,6 +1071,20 @@ class OdooUserProvisioning:
 
 def main():
     """Fonction principale pour tester le système"""
+    parser = argparse.ArgumentParser(description="Import des utilisateurs Odoo depuis un fichier CSV")
+    parser.add_argument("csv_file", nargs="?", default="utilisateurs.csv")
+    parser.add_argument("--workers", type=int, default=IMPORT_WORKERS,
+                        help="Lignes traitées en parallèle (1: import séquentiel)")
+    parser.add_argument("--queue-size", type=int, default=IMPORT_QUEUE_SIZE,
+                        help="Lignes lues d'avance au plus, en attente d'un worker")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE,
+                        help="Lignes dont les appels Odoo sont regroupés en un seul échange")
+    parser.add_argument("--resume", action="store_true",
+                        help="Reprendre un import interrompu à partir de son point de reprise")
+    parser.add_argument("--checkpoint",
+                        help=f"Journal de reprise (défaut: fichier CSV suivi de {IMPORT_CHECKPOINT_SUFFIX})")
+    args = parser.parse_args()
+    
     provisioning = OdooUserProvisioning()
     
     # Lister les groupes existants (optionnel)
@@ -424,8 +1098,9 @@ def main():
     print("="*50)
     
     # Import des utilisateurs
-    csv_file = "utilisateurs.csv"
-    provisioning.import_accounts_from_csv(csv_file)
+    provisioning.import_accounts_from_csv(args.csv_file, workers=args.workers,
+                                          queue_size=args.queue_size, batch_size=args.batch_size,
+                                          resume=args.resume, checkpoint_path=args.checkpoint)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Tests de résilience contre le serveur Odoo factice (fake_odoo_server.py)
+
+Limiteur adaptatif et disjoncteur sous pannes injectées, reprise du suivi
+des modifications après une interrogation interrompue, reprise d'un import
+CSV depuis son journal.
+
+Usage:
+    python -m pytest -q test_odoo_resilience.py
+
+Auteur: Système IAM Odoo
+Date: 2025-05-28
+"""
+
+import asyncio
+import csv
+
+import pytest
+
+import fake_odoo_server
+import odoo_user_provisioning
+from odoo_changes import ChangeFeed
+from odoo_rpc import (AdaptiveConcurrencyLimiter, AsyncOdooClient, CircuitBreaker,
+                      OdooCallGuard, OdooRPCError, OdooUnavailableError)
+from odoo_user_provisioning import ImportCheckpoint, OdooTransport, OdooUserProvisioning
+
+
+@pytest.fixture
+def serveur():
+    """Serveur Odoo factice sur un port libre, arrêté après le test"""
+    server = fake_odoo_server.start_server(port=0)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def url_de(server) -> str:
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+async def client_connecte(server, guard=None) -> AsyncOdooClient:
+    odoo = server.odoo
+    client = AsyncOdooClient(url_de(server), odoo.db, odoo.username, odoo.password, timeout=5.0)
+    client.guard = guard
+    await client.authenticate()
+    return client
+
+
+def test_limiteur_recule_sous_les_coupures_injectees(serveur):
+    """Les coupures réduisent la limite jusqu'au plancher; les erreurs Odoo ne la touchent pas"""
+    async def scenario():
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=20, min_limit=2, backoff_ratio=0.5)
+        client = await client_connecte(serveur, OdooCallGuard(limiter, CircuitBreaker(min_calls=1000)))
+        try:
+            serveur.error_rate = 1.0
+            for _ in range(5):
+                with pytest.raises(OdooRPCError):
+                    await client.execute_kw('res.users', 'search_count', [[]])
+            assert serveur.injected_errors == 5
+            assert int(limiter.limit) == 20
+
+            serveur.error_rate, serveur.drop_rate = 0.0, 1.0
+            for _ in range(200):
+                with pytest.raises(client.connection_errors):
+                    await client.execute_kw('res.users', 'search_count', [[]])
+                if int(limiter.limit) == limiter.min_limit:
+                    break
+                await asyncio.sleep(0.001)  # Au plus une réduction par aller-retour
+            assert int(limiter.limit) == limiter.min_limit
+
+            serveur.drop_rate = 0.0
+            for _ in range(10):
+                assert await client.execute_kw('res.users', 'search_count', [[]]) == 1
+            assert limiter.limit > limiter.min_limit
+            assert limiter.in_flight == 0
+        finally:
+            await client.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_disjoncteur_s_ouvre_puis_se_referme_apres_un_essai(serveur):
+    """Ouverture après des coupures, refus sans appel Odoo, essai unique puis fermeture"""
+    async def scenario():
+        breaker = CircuitBreaker(failure_threshold=0.5, min_calls=4, window_size=10, open_duration=0.3)
+        client = await client_connecte(serveur, OdooCallGuard(AdaptiveConcurrencyLimiter(), breaker))
+        try:
+            serveur.drop_rate = 1.0
+            for _ in range(4):
+                with pytest.raises(client.connection_errors):
+                    await client.execute_kw('res.users', 'search_count', [[]])
+            assert breaker.state == "open"
+            assert breaker.trips == 1
+
+            dropped = serveur.dropped_connections
+            with pytest.raises(OdooUnavailableError) as rejected:
+                await client.execute_kw('res.users', 'search_count', [[]])
+            assert 0 < rejected.value.retry_after <= 0.3
+            assert serveur.dropped_connections == dropped  # Refusé sans solliciter Odoo
+
+            serveur.drop_rate, serveur.latency = 0.0, 0.3
+            await asyncio.sleep(0.35)
+            probe = asyncio.create_task(client.execute_kw('res.users', 'search_count', [[]]))
+            await asyncio.sleep(0.1)
+            assert breaker.state == "half_open"
+            with pytest.raises(OdooUnavailableError):
+                await client.execute_kw('res.users', 'search_count', [[('active', '=', True)]])
+            assert await probe == 1
+            assert breaker.state == "closed"
+
+            serveur.latency = 0.0
+            assert await client.execute_kw('res.users', 'search_count', [[]]) == 1
+        finally:
+            await client.aclose()
+
+    asyncio.run(scenario())
+
+
+class ClientInterrompu:
+    """Client Odoo dont un appel choisi échoue comme une connexion coupée"""
+
+    def __init__(self, client: AsyncOdooClient):
+        self.client = client
+        self.calls = 0
+        self.fail_at = None
+
+    async def execute_kw(self, *args, **kwargs):
+        self.calls += 1
+        if self.calls == self.fail_at:
+            raise ConnectionResetError("Connexion coupée")
+        return await self.client.execute_kw(*args, **kwargs)
+
+
+def test_suivi_des_modifications_reprend_apres_une_interrogation_interrompue(serveur):
+    """Les pages lues avant la coupure sont relues et signalées à l'interrogation suivante"""
+    odoo = serveur.odoo
+    with odoo.lock:
+        user_ids = [odoo._create('res.users', {'name': f"U{index}", 'login': f"u{index}@example.com"})
+                    for index in range(6)]
+
+    async def scenario():
+        client = ClientInterrompu(await client_connecte(serveur))
+        notified = []
+        feed = ChangeFeed(client, 'res.users', ['name'], batch_size=2,
+                          on_change=lambda changed, removed, initial: notified.append((sorted(changed), initial)))
+        try:
+            await feed.poll()
+            assert notified == [(sorted(user_ids + [1]), True)]
+
+            with odoo.lock:
+                for user_id in user_ids:
+                    odoo._apply('res.users', user_id, {'name': f"Renommé {user_id}"})
+            client.fail_at = client.calls + 2  # Deuxième page de l'interrogation suivante
+            with pytest.raises(ConnectionResetError):
+                await feed.poll()
+            assert len(notified) == 1
+
+            await feed.poll()
+            assert notified[1] == (user_ids, False)
+            assert all(feed.snapshot[user_id]['name'] == f"Renommé {user_id}" for user_id in user_ids)
+        finally:
+            await client.client.aclose()
+
+    asyncio.run(scenario())
+
+
+@pytest.fixture
+def import_factice(serveur, tmp_path, monkeypatch):
+    """Fichier CSV de 10 lignes et importeur relié au serveur factice, sans envoi d'emails"""
+    monkeypatch.chdir(tmp_path)  # Journal des opérations (LOG_FILE)
+    monkeypatch.setattr(OdooUserProvisioning, "send_welcome_email", lambda self, user, password: None)
+    path = tmp_path / "utilisateurs.csv"
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["prenom", "nom", "email", "adresse", "numero_utilisateur", "droits"])
+        for index in range(10):
+            writer.writerow([f"Prénom{index}", f"Nom{index}", f"import{index}@example.com", "", index, ""])
+    transport = OdooTransport(url=url_de(serveur), retries=0)
+    yield OdooUserProvisioning(transport), str(path)
+    transport.close()
+
+
+def comptes_importes(serveur) -> list:
+    with serveur.odoo.lock:
+        return sorted(user['login'] for user in serveur.odoo.records['res.users'].values()
+                      if user['login'].startswith("import"))
+
+
+class Interruption(BaseException):
+    """Arrêt brutal simulé (équivalent d'un Ctrl+C) au milieu de l'import"""
+
+
+def test_import_reprend_apres_une_interruption(serveur, import_factice, monkeypatch):
+    """La reprise ne renvoie pas les lignes journalisées et termine l'import"""
+    provisioning, path = import_factice
+    process_rows = OdooUserProvisioning._process_rows
+    chunks = []
+
+    def interrompu(self, *args, **kwargs):
+        chunks.append(args[1])
+        if len(chunks) == 3:
+            raise Interruption()
+        return process_rows(self, *args, **kwargs)
+
+    monkeypatch.setattr(OdooUserProvisioning, "_process_rows", interrompu)
+    with pytest.raises(Interruption):
+        provisioning.import_accounts_from_csv(path, workers=1, batch_size=3)
+    assert len(comptes_importes(serveur)) == 6
+    state = ImportCheckpoint(path + odoo_user_provisioning.IMPORT_CHECKPOINT_SUFFIX).load()
+    assert [line for line, _, _ in state["results"]] == list(range(1, 7))
+    assert not state["completed"]
+
+    chunks.clear()
+    summary = provisioning.import_accounts_from_csv(path, workers=1, batch_size=3, resume=True)
+    assert [row['email'] for chunk in chunks for row in chunk] == [f"import{index}@example.com"
+                                                                   for index in range(6, 10)]
+    assert summary["total"] == 10 and summary["successful"] == 10
+    assert summary["failed_lines"] == [] and summary["unfinished_lines"] == []
+    assert len(comptes_importes(serveur)) == 10
+
+
+def test_import_retente_a_la_reprise_les_lignes_sans_reponse(serveur, import_factice):
+    """Les lignes coupées ne sont pas journalisées: la reprise les crée"""
+    provisioning, path = import_factice
+    serveur.drop_rate = 1.0
+    summary = provisioning.import_accounts_from_csv(path, workers=2, batch_size=3)
+    assert summary["successful"] == 0
+    assert summary["unfinished_lines"] == list(range(1, 11))
+    state = ImportCheckpoint(path + odoo_user_provisioning.IMPORT_CHECKPOINT_SUFFIX).load()
+    assert state["results"] == [] and not state["completed"]
+
+    serveur.drop_rate = 0.0
+    summary = provisioning.import_accounts_from_csv(path, workers=2, batch_size=3, resume=True)
+    assert summary["successful"] == 10 and summary["unfinished_lines"] == []
+    assert len(comptes_importes(serveur)) == 10
+    assert ImportCheckpoint(path + odoo_user_provisioning.IMPORT_CHECKPOINT_SUFFIX).load()["completed"]